@@ -7,12 +7,30 @@ from app.routes.usuarios import usuarios_bp
 from app.routes.admin import admin_bp
 from app.routes.proveedores import proveedores_bp
 from app.routes.ofertas import ofertas_bp
-from db import close_db
+from app.utils.trabajos import CONFIG_TRABAJOS
+from app.utils.costos import CONFIG_COSTOS
+from app.utils.eventos import CONFIG_EVENTOS
+from app.utils.perfil_sql import CONFIG_PERFIL, instalar as instalar_perfil_sql
+from db import close_db, CONFIG_SQLITE
 
-def create_app():
+def create_app(config=None):
     app = Flask(__name__)
     app.secret_key = "clave-super-secreta"
 
+    # Conexiones SQLite: valores por defecto, variables FLASK_* (ej. FLASK_SQLITE_BUSY_TIMEOUT=10000)
+    # y por último lo que se pase explícitamente
+    app.config.from_mapping(CONFIG_SQLITE)
+    app.config.from_mapping(CONFIG_TRABAJOS)
+    app.config.from_mapping(CONFIG_COSTOS)
+    app.config.from_mapping(CONFIG_EVENTOS)
+    app.config.from_mapping(CONFIG_PERFIL)
+    app.config.from_prefixed_env()
+    if config:
+        app.config.update(config)
+
+    # Perfil de SQL por request (opcional): FLASK_SQLITE_PERFIL=true
+    instalar_perfil_sql(app)
+
     # Registrar Blueprints
     app.register_blueprint(auth_bp)
     app.register_blueprint(productos_bp)
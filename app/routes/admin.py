@@ -1,6 +1,7 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, render_template, request, jsonify
 from db import get_db
 from app.utils.auth_decorators import admin_required
+from app.utils.perfil_sql import metricas, reiniciar_metricas
 
 admin_bp = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -24,3 +25,12 @@ def users():
     db = get_db()
     lista = db.execute("SELECT id, username, role FROM usuarios").fetchall()
     return render_template("usuarios/index.html", usuarios=lista)
+
+
+@admin_bp.route("/metrics", methods=["GET", "POST"])
+@admin_required
+def metrics():
+    """Latencias y consultas SQL por endpoint (requiere SQLITE_PERFIL). POST las reinicia."""
+    if request.method == "POST":
+        reiniciar_metricas()
+    return jsonify(metricas())
@@ -1,5 +1,6 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
 from db import get_db, hash_pass
+from app.utils.carritos import eliminar_carrito
 from app.utils.auth_decorators import login_required, admin_required
 auth_bp = Blueprint("auth", __name__, url_prefix="/auth")
 
@@ -24,5 +25,10 @@ def login():
 
 @auth_bp.route("/logout")
 def logout():
+    # El carrito activo es de esta sesión: si queda en la base bloquea borrar productos y usuarios
+    if session.get("carrito_id"):
+        db = get_db()
+        eliminar_carrito(db, session["carrito_id"])
+        db.commit()
     session.clear()
     return redirect("/")
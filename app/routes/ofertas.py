@@ -1,16 +1,28 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
 from db import get_db
 from app.utils.auth_decorators import login_required, admin_required
-from datetime import datetime
+from app.utils.fechas import ahora_texto, normalizar as normalizar_fecha
+from app.utils.indice_ofertas import invalidar_indice_ofertas, hay_ofertas_vencidas
+from app.utils.cache import invalidar_cache
 
 ofertas_bp = Blueprint("ofertas", __name__, url_prefix="/ofertas")
 
 def desactivar_ofertas_expiradas():
-    """Desactiva automáticamente las ofertas que han expirado."""
+    """
+    Desactiva automáticamente las ofertas que han expirado.
+    Solo escribe en la base cuando ya pasó el próximo vencimiento conocido;
+    el resto de las veces es una comparación en memoria.
+    """
     db = get_db()
-    now = datetime.now().strftime('%Y-%m-%dT%H:%M')
+    now = ahora_texto()
+    if not hay_ofertas_vencidas(db, now):
+        return
+
     db.execute("UPDATE ofertas SET activo = 0 WHERE fecha_fin < ? AND activo = 1", (now,))
     db.commit()
+    # Aunque otro worker ya las haya desactivado, hay que recalcular el próximo vencimiento
+    invalidar_indice_ofertas()
+    invalidar_cache()
 
 @ofertas_bp.route("/")
 @login_required
@@ -38,8 +50,8 @@ def nueva():
     if request.method == "POST":
         nombre = request.form.get("nombre")
         descripcion = request.form.get("descripcion")
-        fecha_inicio = request.form.get("fecha_inicio")
-        fecha_fin = request.form.get("fecha_fin")
+        fecha_inicio = normalizar_fecha(request.form.get("fecha_inicio"))
+        fecha_fin = normalizar_fecha(request.form.get("fecha_fin"))
         tipo_oferta = request.form.get("tipo_oferta")
         descuento_global = request.form.get("descuento_global", 0)
 
@@ -110,6 +122,8 @@ def nueva():
                         continue
 
         db.commit()
+        invalidar_indice_ofertas()
+        invalidar_cache()
         flash("Oferta creada exitosamente", "success")
         return redirect(url_for("ofertas.index"))
 
@@ -129,8 +143,8 @@ def editar(id):
     if request.method == "POST":
         nombre = request.form.get("nombre")
         descripcion = request.form.get("descripcion")
-        fecha_inicio = request.form.get("fecha_inicio")
-        fecha_fin = request.form.get("fecha_fin")
+        fecha_inicio = normalizar_fecha(request.form.get("fecha_inicio"))
+        fecha_fin = normalizar_fecha(request.form.get("fecha_fin"))
         tipo_oferta = request.form.get("tipo_oferta")
         descuento_global = request.form.get("descuento_global", 0)
         activo = 1 if request.form.get("activo") else 0
@@ -205,6 +219,8 @@ def editar(id):
                         continue
 
         db.commit()
+        invalidar_indice_ofertas()
+        invalidar_cache()
         flash("Oferta actualizada exitosamente", "success")
         return redirect(url_for("ofertas.index"))
 
@@ -225,6 +241,8 @@ def eliminar(id):
     db = get_db()
     db.execute("DELETE FROM ofertas WHERE id = ?", (id,))
     db.commit()
+    invalidar_indice_ofertas()
+    invalidar_cache()
     flash("Oferta eliminada", "success")
     return redirect(url_for("ofertas.index"))
 
@@ -238,5 +256,7 @@ def toggle(id):
         nuevo_estado = 0 if oferta["activo"] else 1
         db.execute("UPDATE ofertas SET activo = ? WHERE id = ?", (nuevo_estado, id))
         db.commit()
+        invalidar_indice_ofertas()
+        invalidar_cache()
         flash(f"Oferta {'activada' if nuevo_estado else 'desactivada'}", "success")
     return redirect(url_for("ofertas.index"))
@@ -1,43 +1,69 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
-from db import get_db
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, make_response, Response
+import sqlite3, csv, io
+from db import get_db, transaccion
 from app.utils.auth_decorators import login_required
-from datetime import datetime
-from app.routes.ofertas import desactivar_ofertas_expiradas
+from app.utils.indice_ofertas import ofertas_vigentes
+from app.utils.busqueda import buscar_productos
+from app.utils.fechas import ahora_texto
+from app.utils.cache import invalidar_cache
+from app.utils.carritos import limpiar_abandonados
+from app.utils.costos import consumir_lotes
+from app.utils.importacion import COLUMNAS, leer_filas, planificar_importacion, aplicar_importacion
 
 productos_bp = Blueprint("productos", __name__, url_prefix="/productos")
 
-def calcular_precio_con_oferta(db, producto_id, cantidad=1):
+def calcular_precio_con_oferta(db, producto_id, cantidad=1, precio=None):
     """
     Calcula el precio final de un producto considerando ofertas activas.
     Retorna un dict con precio_final, descuento_aplicado, tipo_oferta, etc.
+    Las ofertas salen del índice en memoria; si se pasa `precio` no se consulta la base.
     """
-    # Desactivar ofertas expiradas antes de calcular
-    desactivar_ofertas_expiradas()
+    if precio is None:
+        producto = db.execute("SELECT precio FROM productos WHERE id = ?", (producto_id,)).fetchone()
+        if not producto:
+            return {"precio_final": 0, "descuento_aplicado": 0, "tipo_oferta": None}
+        precio = producto["precio"]
 
-    producto = db.execute("SELECT precio FROM productos WHERE id = ?", (producto_id,)).fetchone()
-    if not producto:
-        return {"precio_final": 0, "descuento_aplicado": 0, "tipo_oferta": None}
+    return _aplicar_ofertas(precio, ofertas_vigentes(db, producto_id), cantidad)
 
-    precio_original = producto["precio"]
+
+def calcular_precios_lote(db, items, precios_base=None):
+    """
+    Calcula precios con oferta para varios productos en una sola consulta.
+    `items` es una lista de (producto_id, cantidad); si un producto aparece más de una vez
+    se suman sus cantidades. Si el que llama ya leyó los precios de lista los puede pasar
+    en `precios_base` ({producto_id: precio}) y no se vuelven a consultar.
+    Retorna {producto_id: info} con el mismo formato que calcular_precio_con_oferta
+    (los productos inexistentes no aparecen).
+    """
+    cantidades = {}
+    for producto_id, cantidad in items:
+        producto_id = int(producto_id)
+        cantidades[producto_id] = cantidades.get(producto_id, 0) + cantidad
+
+    if not cantidades:
+        return {}
+
+    if precios_base is None:
+        placeholders = ",".join(["?"] * len(cantidades))
+        precios_base = dict(db.execute(
+            f"SELECT id, precio FROM productos WHERE id IN ({placeholders})", list(cantidades)
+        ).fetchall())
+
+    ahora = ahora_texto()
+    return {
+        producto_id: _aplicar_ofertas(precios_base[producto_id], ofertas_vigentes(db, producto_id, ahora), cantidad)
+        for producto_id, cantidad in cantidades.items() if producto_id in precios_base
+    }
+
+
+def _aplicar_ofertas(precio_original, ofertas, cantidad):
+    """Aplica las ofertas vigentes (ya ordenadas por prioridad) sobre el precio base."""
     precio_final = precio_original
     descuento_aplicado = 0
     tipo_oferta = None
     descripcion_oferta = None
 
-    # Buscar ofertas activas para este producto
-    ahora = datetime.now().strftime("%Y-%m-%dT%H:%M")
-
-    ofertas = db.execute("""
-        SELECT o.*, op.*
-        FROM ofertas o
-        JOIN oferta_productos op ON o.id = op.oferta_id
-        WHERE op.producto_id = ?
-        AND o.activo = 1
-        AND o.fecha_inicio <= ?
-        AND o.fecha_fin >= ?
-        ORDER BY o.fecha_inicio DESC
-    """, (producto_id, ahora, ahora)).fetchall()
-
     for oferta in ofertas:
         if oferta["tipo_oferta"] == "individual_precio" and oferta["precio_oferta"]:
             # Precio fijo
@@ -172,13 +198,16 @@ def editar(id):
             cantidad_basura = float(request.form["cantidad_basura"])
             if cantidad_basura > 0:
                 if cantidad_basura <= producto["stock_defectuoso"]:
-                    db.execute("""
-                        UPDATE productos
-                        SET stock_defectuoso = stock_defectuoso - ?,
-                            stock = stock - ?
-                        WHERE id=?
-                    """, (cantidad_basura, cantidad_basura, id))
-                    db.commit()
+                    # Lo que se tira sale de los lotes igual que una venta (FIFO), si no
+                    # el costo de las próximas ventas saldría de mercadería que ya no está
+                    with transaccion(db):
+                        db.execute("""
+                            UPDATE productos
+                            SET stock_defectuoso = stock_defectuoso - ?,
+                                stock = stock - ?
+                            WHERE id=?
+                        """, (cantidad_basura, cantidad_basura, id))
+                        consumir_lotes(db, id, cantidad_basura)
                     flash(f"Se tiraron {cantidad_basura} unidades defectuosas a la basura", "danger")
                 else:
                     flash("Cantidad excede el stock defectuoso", "danger")
@@ -194,12 +223,105 @@ def editar(id):
 @login_required
 def delete(id):
     db = get_db()
-    db.execute("DELETE FROM productos WHERE id=?", (id,))
-    db.commit()
+    try:
+        limpiar_abandonados(db)
+        db.execute("DELETE FROM productos WHERE id=?", (id,))
+        db.commit()
+    except sqlite3.IntegrityError:
+        # Con foreign_keys activado no se puede borrar un producto con ventas, compras
+        # o que esté en un carrito en curso
+        db.rollback()
+        con_movimientos = db.execute("""
+            SELECT 1 FROM detalle_ventas WHERE producto_id = ?
+            UNION ALL
+            SELECT 1 FROM ingresos_stock WHERE producto_id = ?
+            LIMIT 1
+        """, (id, id)).fetchone()
+        if con_movimientos:
+            flash("No se puede eliminar: el producto tiene ventas o compras registradas", "danger")
+        else:
+            flash("No se puede eliminar: el producto está en un carrito en curso o aparcado", "danger")
+        return redirect(url_for("productos.lista"))
     flash("Producto eliminado", "danger")
     return redirect(url_for("productos.lista"))
 
 
+@productos_bp.route("/importar", methods=["GET", "POST"])
+@login_required
+def importar():
+    """
+    Alta y actualización masiva de productos y precios desde CSV o JSON
+    (columnas: nombre, precio, categoria, unidad, stock). Con simular=1 solo valida.
+    Devuelve el reporte por fila en JSON si el pedido vino en JSON o con formato=json.
+    """
+    if request.method == "GET":
+        return render_template("productos/importar.html")
+
+    quiere_json = request.is_json or request.args.get("formato") == "json"
+    simular = (request.values.get("simular") or "") in ("1", "on", "true")
+
+    archivo = request.files.get("archivo")
+    if archivo and archivo.filename:
+        contenido = archivo.read()
+        formato = "json" if archivo.filename.lower().endswith(".json") else "csv"
+    else:
+        contenido = request.get_data()
+        formato = "json" if request.is_json else "csv"
+
+    try:
+        filas = leer_filas(contenido, formato)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if quiere_json:
+            return jsonify({"error": f"Archivo inválido: {e}"}), 400
+        flash(f"Archivo inválido: {e}", "danger")
+        return redirect(url_for("productos.importar"))
+
+    db = get_db()
+    altas, cambios, reporte = planificar_importacion(db, filas)
+    errores = sum(1 for r in reporte if r["estado"] == "error")
+    aplicado = not errores and not simular and bool(altas or cambios)
+    if aplicado:
+        with transaccion(db):
+            aplicar_importacion(db, altas, cambios)
+        invalidar_cache()
+
+    resumen = {
+        "aplicado": aplicado,
+        "filas": len(reporte),
+        "nuevos": len(altas),
+        "actualizados": len(cambios),
+        "errores": errores,
+    }
+    if quiere_json:
+        return jsonify({"resumen": resumen, "filas": reporte}), (400 if errores else 200)
+    return render_template("productos/importar.html", resumen=resumen, reporte=reporte, simular=simular)
+
+
+@productos_bp.route("/exportar")
+@login_required
+def exportar():
+    """Catálogo con las mismas columnas que acepta /productos/importar."""
+    db = get_db()
+    productos = db.execute("""
+        SELECT p.nombre, p.precio, c.nombre AS categoria, u.nombre AS unidad, p.stock
+        FROM productos p
+        LEFT JOIN categorias c ON p.categoria_id = c.id
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        ORDER BY p.nombre
+    """).fetchall()
+
+    if request.args.get("formato") == "json":
+        return jsonify([dict(p) for p in productos])
+
+    salida = io.StringIO()
+    salida.write("\ufeff")  # BOM para que Excel lea bien los acentos
+    writer = csv.writer(salida)
+    writer.writerow(COLUMNAS)
+    writer.writerows([tuple(p) for p in productos])
+    return Response(salida.getvalue(), mimetype="text/csv",
+                    headers={"Content-Disposition": "attachment; filename=productos.csv"})
+
+
 @productos_bp.route("/stock/<int:id>", methods=["GET", "POST"])
 @login_required
 def gestionar_stock(id):
@@ -221,8 +343,8 @@ def gestionar_stock(id):
         # Registrar ingreso de stock
         db.execute("""
             INSERT INTO ingresos_stock (producto_id, proveedor_id, cantidad, fecha, precio_unitario)
-            VALUES (?, ?, ?, datetime('now', 'localtime'), ?)
-        """, (id, proveedor_id, cantidad, precio_unitario))
+            VALUES (?, ?, ?, ?, ?)
+        """, (id, proveedor_id, cantidad, ahora_texto(), precio_unitario))
 
         # Actualizar stock del producto
         db.execute("""
@@ -232,6 +354,7 @@ def gestionar_stock(id):
         """, (cantidad, id))
 
         db.commit()
+        invalidar_cache()
 
         proveedor = db.execute("SELECT nombre FROM proveedores WHERE id=?", (proveedor_id,)).fetchone()
         flash(f"Stock ingresado: +{cantidad} unidades de {proveedor['nombre']}", "success")
@@ -277,22 +400,14 @@ def autocomplete():
 
     # Si no encontró por ID o no es número, busca por nombre
     if not rows:
-        rows = db.execute("""
-            SELECT
-                p.id,
-                p.nombre,
-                p.precio,
-                u.nombre AS unidad
-            FROM productos p
-            LEFT JOIN unidades u ON p.unidad_id = u.id
-            WHERE p.nombre LIKE ?
-            LIMIT 10
-        """, (f"%{q}%",)).fetchall()
+        rows = buscar_productos(db, q, limite=10)
 
-    # Calcular precios con ofertas para cada producto
+    # Calcular precios con ofertas para todos los productos de una vez
+    precios = calcular_precios_lote(db, [(r["id"], cantidad) for r in rows],
+                                    precios_base={r["id"]: r["precio"] for r in rows})
     resultados = []
     for r in rows:
-        info_oferta = calcular_precio_con_oferta(db, r["id"], cantidad)
+        info_oferta = precios[r["id"]]
         resultados.append({
             "id": r["id"],
             "nombre": r["nombre"],
@@ -305,3 +420,90 @@ def autocomplete():
         })
 
     return jsonify(resultados)
+
+
+# Columnas de cada fila de /productos/catalogo (las filas van como listas para achicar el JSON)
+COLUMNAS_CATALOGO = ["id", "nombre", "unidad", "precio", "stock", "ofertas"]
+# Cada oferta del resumen: [tipo_oferta, precio_oferta, cantidad_minima, descuento_porcentaje, fecha_inicio, fecha_fin]
+
+
+@productos_bp.route("/catalogo")
+@login_required
+def catalogo():
+    """
+    Copia compacta del catálogo para que las terminales busquen localmente.
+    Con ?since=<version> devuelve solo las filas que cambiaron desde esa versión.
+    La respuesta lleva un ETag fuerte: si no hubo cambios responde 304 sin cuerpo.
+    """
+    db = get_db()
+    version = db.execute("SELECT version FROM catalogo_version WHERE id = 1").fetchone()["version"]
+
+    since = request.args.get("since", type=int)
+    if since is not None and since > version:
+        since = None  # versión desconocida (otra base): mandar todo
+
+    etag = f"catalogo-{version}" if since is None else f"catalogo-{since}-{version}"
+    if request.if_none_match.contains(etag):
+        resp = make_response("", 304)
+        resp.set_etag(etag)
+        return resp
+
+    filtro = "" if since is None else "WHERE p.version > ?"
+    params = [] if since is None else [since]
+
+    productos = db.execute(f"""
+        SELECT
+            p.id,
+            p.nombre,
+            u.nombre AS unidad,
+            p.precio,
+            p.stock - p.stock_defectuoso AS stock
+        FROM productos p
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        {filtro}
+        ORDER BY p.id
+    """, params).fetchall()
+
+    # Ofertas activas que todavía no vencieron, en el mismo orden de prioridad que el cálculo de precios
+    ahora = ahora_texto()
+    ofertas = {}
+    for o in db.execute(f"""
+        SELECT
+            op.producto_id,
+            o.tipo_oferta,
+            op.precio_oferta,
+            op.cantidad_minima,
+            CASE WHEN o.tipo_oferta = 'conjunto_descuento'
+                 THEN COALESCE(NULLIF(o.descuento_global, 0), op.descuento_porcentaje)
+                 ELSE op.descuento_porcentaje END AS descuento,
+            o.fecha_inicio,
+            o.fecha_fin
+        FROM ofertas o
+        JOIN oferta_productos op ON o.id = op.oferta_id
+        WHERE o.activo = 1 AND o.fecha_fin >= ?
+        {"" if since is None else "AND op.producto_id IN (SELECT id FROM productos p WHERE p.version > ?)"}
+        ORDER BY o.fecha_inicio DESC, o.id DESC
+    """, [ahora] + params):
+        ofertas.setdefault(o["producto_id"], []).append(
+            [o["tipo_oferta"], o["precio_oferta"], o["cantidad_minima"], o["descuento"], o["fecha_inicio"], o["fecha_fin"]]
+        )
+
+    eliminados = []
+    if since is not None:
+        eliminados = [r["producto_id"] for r in db.execute(
+            "SELECT producto_id FROM catalogo_eliminados WHERE version > ?", (since,)
+        )]
+
+    resp = jsonify({
+        "version": version,
+        "completo": since is None,
+        "columnas": COLUMNAS_CATALOGO,
+        "productos": [
+            [p["id"], p["nombre"], p["unidad"], p["precio"], p["stock"], ofertas.get(p["id"], [])]
+            for p in productos
+        ],
+        "eliminados": eliminados
+    })
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "private, no-cache"
+    return resp
@@ -1,6 +1,12 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash
-from db import get_db
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+import csv
+from db import get_db, transaccion
 from app.utils.auth_decorators import login_required, admin_required
+from app.utils.paginacion import decodificar_cursor, paginar
+from app.utils.fechas import ahora_texto
+from app.utils.cache import invalidar_cache
+from app.utils.importacion import leer_filas
+from app.utils.compras import validar_lineas, registrar_compra
 
 proveedores_bp = Blueprint("proveedores", __name__, url_prefix="/proveedores")
 
@@ -42,6 +48,7 @@ def nuevo():
                 VALUES (?, ?, ?, ?)
             """, (nombre, contacto, telefono, email))
             db.commit()
+            invalidar_cache()
             flash("Proveedor creado correctamente", "success")
             return redirect(url_for("proveedores.lista"))
         except Exception as e:
@@ -68,6 +75,7 @@ def editar(id):
             WHERE id=?
         """, (nombre, contacto, telefono, email, id))
         db.commit()
+        invalidar_cache()
 
         flash("Proveedor actualizado", "success")
         return redirect(url_for("proveedores.lista"))
@@ -91,17 +99,28 @@ def delete(id):
 
     db.execute("DELETE FROM proveedores WHERE id=?", (id,))
     db.commit()
+    invalidar_cache()
     flash("Proveedor eliminado", "danger")
     return redirect(url_for("proveedores.lista"))
 
 
+INGRESOS_POR_PAGINA = 100
+
+
 @proveedores_bp.route("/<int:id>/ingresos")
 @login_required
 def ingresos(id):
     db = get_db()
     proveedor = db.execute("SELECT * FROM proveedores WHERE id=?", (id,)).fetchone()
 
-    ingresos_stock = db.execute("""
+    # Paginación por cursor sobre (fecha, id): usa idx_ingresos_proveedor(proveedor_id, fecha)
+    cursor = decodificar_cursor(request.args.get("cursor"))
+    condicion, params = "", [id]
+    if cursor:
+        condicion = "AND (i.fecha, i.id) < (?, ?)"
+        params.extend(cursor)
+
+    ingresos_stock, siguiente = paginar(db.execute(f"""
         SELECT
             i.id,
             i.fecha,
@@ -113,13 +132,22 @@ def ingresos(id):
         FROM ingresos_stock i
         JOIN productos p ON i.producto_id = p.id
         LEFT JOIN unidades u ON p.unidad_id = u.id
-        WHERE i.proveedor_id = ?
-        ORDER BY i.fecha DESC
-    """, (id,)).fetchall()
+        WHERE i.proveedor_id = ? {condicion}
+        ORDER BY i.fecha DESC, i.id DESC
+        LIMIT {INGRESOS_POR_PAGINA + 1}
+    """, params), INGRESOS_POR_PAGINA)
+
+    if request.args.get("formato") == "json":
+        return jsonify({
+            "ingresos": [dict(i) for i in ingresos_stock],
+            "siguiente": siguiente
+        })
 
     return render_template("proveedores/ingresos.html",
                            proveedor=proveedor,
-                           ingresos=ingresos_stock)
+                           ingresos=ingresos_stock,
+                           siguiente=siguiente,
+                           primera_pagina=cursor is None)
 
 
 @proveedores_bp.route("/<int:id>/agregar_compra", methods=["GET", "POST"])
@@ -139,40 +167,34 @@ def agregar_compra(id):
     """).fetchall()
 
     if request.method == "POST":
-        # Procesar los productos agregados
-        productos_ids = request.form.getlist("producto_id[]")
-        cantidades = request.form.getlist("cantidad[]")
-        precios = request.form.getlist("precio[]")
-
-        from datetime import datetime
-        fecha = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        for prod_id, cant, prec in zip(productos_ids, cantidades, precios):
-            if prod_id and cant:
-                try:
-                    cantidad = float(cant)
-                    precio_unitario = float(prec) if prec else None
-                    if cantidad <= 0:
-                        continue
-
-                    # Registrar ingreso de stock
-                    db.execute("""
-                        INSERT INTO ingresos_stock (producto_id, proveedor_id, cantidad, fecha, precio_unitario)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (prod_id, id, cantidad, fecha, precio_unitario))
-
-                    # Actualizar stock del producto
-                    db.execute("""
-                        UPDATE productos
-                        SET stock = stock + ?
-                        WHERE id = ?
-                    """, (cantidad, prod_id))
-
-                except ValueError:
-                    continue
-
-        db.commit()
-        flash("Compra registrada correctamente", "success")
+        remito = request.files.get("remito")
+        if remito and remito.filename:
+            # Remito en CSV: producto (nombre o id), cantidad, precio
+            try:
+                filas = leer_filas(remito.read(), "csv")
+            except (ValueError, UnicodeDecodeError, csv.Error) as e:
+                flash(f"Remito inválido: {e}", "danger")
+                return redirect(url_for("proveedores.agregar_compra", id=id))
+        else:
+            filas = [
+                {"producto_id": p, "cantidad": c, "precio": pr}
+                for p, c, pr in zip(request.form.getlist("producto_id[]"),
+                                    request.form.getlist("cantidad[]"),
+                                    request.form.getlist("precio[]"))
+            ]
+
+        # Primero se valida todo: si una línea está mal no se registra ninguna
+        lineas, errores = validar_lineas(db, filas)
+        if errores or not lineas:
+            for error in errores or ["El remito no tiene productos"]:
+                flash(error, "danger")
+            return redirect(url_for("proveedores.agregar_compra", id=id))
+
+        with transaccion(db):
+            registrar_compra(db, id, lineas, ahora_texto())
+        invalidar_cache()
+
+        flash(f"Compra registrada correctamente ({len(lineas)} líneas)", "success")
         return redirect(url_for("proveedores.ingresos", id=id))
 
     return render_template("proveedores/agregar_compra.html",
@@ -1,15 +1,20 @@
 from reportlab.pdfgen import canvas
 from reportlab.lib.pagesizes import letter
-from flask import Blueprint, render_template, request, jsonify, send_file
-import datetime, csv, io
+from flask import Blueprint, render_template, request, jsonify, send_file, url_for, Response, stream_with_context, current_app
+import datetime, csv, io, tempfile, zlib
 from db import get_db
 from app.utils.auth_decorators import login_required
+from app.utils.trabajos import TIPOS, encolar_trabajo, obtener_trabajo
+from app.utils.paginacion import decodificar_cursor, paginar
+from app.utils.fechas import inicio_del_dia, inicio_del_dia_siguiente
+from app.utils.cache import cacheado
+from app.utils.eventos import flujo
 
 
 reportes_bp = Blueprint("reportes", __name__, url_prefix="/reportes")
 
 
-def _build_ventas_query(args, limit=200):
+def _build_ventas_query(args, limit=200, despues=None):
     # Leer filtros desde args
     fecha_desde = args.get("fecha_desde")
     fecha_hasta = args.get("fecha_hasta")
@@ -44,13 +49,22 @@ def _build_ventas_query(args, limit=200):
             sql += " AND (" + " OR ".join(conds) + ")"
         sql += ")"
 
-    # Date filters (fuera del EXISTS, sobre la venta)
-    if fecha_desde:
-        where.append("date(substr(v.fecha,1,10)) >= date(?)")
-        params.append(fecha_desde)
-    if fecha_hasta:
-        where.append("date(substr(v.fecha,1,10)) <= date(?)")
-        params.append(fecha_hasta)
+    # Date filters (fuera del EXISTS, sobre la venta). Rango semiabierto sobre la columna
+    # tal cual: [desde 00:00:00, día siguiente a hasta 00:00:00), así usa idx_ventas_fecha
+    desde = inicio_del_dia(fecha_desde) if fecha_desde else None
+    hasta = inicio_del_dia_siguiente(fecha_hasta) if fecha_hasta else None
+    if desde:
+        where.append("v.fecha >= ?")
+        params.append(desde)
+    if hasta:
+        where.append("v.fecha < ?")
+        params.append(hasta)
+
+    # Paginación por cursor: ventas anteriores a (fecha, id) de la última fila vista.
+    # La comparación por fila usa idx_ventas_fecha para saltar directo a la página.
+    if despues:
+        where.append("(v.fecha, v.id) < (?, ?)")
+        params.extend(despues)
 
     # Filtrar por total de la venta
     if precio_min:
@@ -67,7 +81,10 @@ def _build_ventas_query(args, limit=200):
         else:
             sql += " WHERE " + " AND ".join(where)
 
-    sql += f" ORDER BY v.fecha DESC LIMIT {int(limit)}"
+    # id como desempate: el orden es estable aunque varias ventas compartan fecha
+    sql += " ORDER BY v.fecha DESC, v.id DESC"
+    if limit is not None:
+        sql += f" LIMIT {int(limit)}"
 
     filtros = {
         "fecha_desde": fecha_desde,
@@ -82,128 +99,155 @@ def _build_ventas_query(args, limit=200):
     return sql, params, filtros
 
 
+# -----------------------
+# Detalle de ventas en lote
+# -----------------------
+# Una consulta por lote de ventas en vez de una por venta (evita el N+1 del export).
+
+LOTE_DETALLES = 500  # por debajo del límite de parámetros de SQLite
+
+
+def detalles_por_venta(db, venta_ids):
+    """Retorna {venta_id: [líneas]} con d.*, nombre y unidad del producto, en orden de carga."""
+    venta_ids = list(venta_ids)
+    detalles = {venta_id: [] for venta_id in venta_ids}
+
+    for i in range(0, len(venta_ids), LOTE_DETALLES):
+        lote = venta_ids[i:i + LOTE_DETALLES]
+        placeholders = ",".join("?" * len(lote))
+        filas = db.execute(f"""
+            SELECT d.*, p.nombre, u.nombre as unidad
+            FROM detalle_ventas d
+            JOIN productos p ON d.producto_id = p.id
+            LEFT JOIN unidades u ON p.unidad_id = u.id
+            WHERE d.venta_id IN ({placeholders})
+            ORDER BY d.venta_id, d.id
+        """, lote).fetchall()
+
+        for f in filas:
+            detalles[f["venta_id"]].append(f)
+
+    return detalles
+
+
+def describir_detalles(detalles, con_unidad=False):
+    """Descripción corta de las líneas: "Manzana x2 kg, Pera x1 ..."."""
+    if con_unidad:
+        return ", ".join([
+            f"{d['nombre']} x{d['cantidad']}{' ' + d['unidad'] if d['unidad'] else ''}"
+            for d in detalles
+        ])
+    return ", ".join([f"{d['nombre']} x{d['cantidad']}" for d in detalles])
+
+
+VENTAS_POR_PAGINA = 200
+
+
 @reportes_bp.route("/")
 @login_required
 def index():
     db = get_db()
 
+    # Construir la consulta usando helper centralizado (respeta todos los filtros)
+    cursor = decodificar_cursor(request.args.get("cursor"))
+    sql, params, filtros = _build_ventas_query(request.args, limit=VENTAS_POR_PAGINA + 1, despues=cursor)
+
+    ventas, siguiente = paginar(db.execute(sql, params), VENTAS_POR_PAGINA)
+
+    if request.args.get("formato") == "json":
+        return jsonify({
+            "ventas": [{"id": v["id"], "fecha": v["fecha"], "total": v["total"]} for v in ventas],
+            "siguiente": siguiente
+        })
+
     # Obtener filtros posibles para el formulario
     productos = db.execute("SELECT id, nombre FROM productos ORDER BY nombre").fetchall()
     categorias = db.execute("SELECT id, nombre FROM categorias ORDER BY nombre").fetchall()
     unidades = db.execute("SELECT id, nombre FROM unidades ORDER BY nombre").fetchall()
 
-    # Construir la consulta usando helper centralizado (respeta todos los filtros)
-    sql, params, filtros = _build_ventas_query(request.args, limit=200)
+    # Mismos filtros, sin el cursor: para armar los links de página
+    filtros_url = [(k, v) for k, v in request.args.items(multi=True) if k not in ("cursor", "formato")]
 
-    ventas = db.execute(sql, params).fetchall()
     return render_template("reportes/reportes.html", ventas=ventas,
                            productos=productos, categorias=categorias, unidades=unidades,
-                           filtros=filtros)
+                           filtros=filtros, siguiente=siguiente, primera_pagina=cursor is None,
+                           filtros_url=filtros_url)
 
-@reportes_bp.route("/export/pdf")
-@login_required
-def export_pdf():
-    from reportlab.lib import colors
-    from reportlab.lib.pagesizes import letter
-    from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
+# -----------------------
+# Export PDF por partes
+# -----------------------
+# La tabla se arma en bloques de PDF_FILAS_TABLA filas (con el encabezado repetido en
+# cada página) que se leen del cursor a medida que reportlab los va maquetando, así
+# ni la lista de ventas ni una tabla gigante quedan en memoria y el layout es lineal.
+# El resultado va a un archivo temporal (en memoria hasta PDF_SPOOL_MAX) que se envía
+# en streaming. escribir_pdf_ventas no depende del request: puede correr en otro proceso.
 
-    db = get_db()
-    # Construir la misma consulta que usa la vista de reportes para respetar filtros
-    sql, params, _ = _build_ventas_query(request.args, limit=1000)
-    ventas = db.execute(sql, params).fetchall()
-
-    # Obtener detalles de productos para cada venta
-    ventas_con_detalles = []
-    for venta in ventas:
-        detalles = db.execute("""
-            SELECT d.cantidad, p.nombre, u.nombre as unidad
-            FROM detalle_ventas d
-            JOIN productos p ON d.producto_id = p.id
-            LEFT JOIN unidades u ON p.unidad_id = u.id
-            WHERE d.venta_id = ?
-            ORDER BY p.nombre
-        """, (venta["id"],)).fetchall()
+PDF_FILAS_TABLA = 200
+PDF_SPOOL_MAX = 8 * 1024 * 1024
 
-        # Crear descripción de productos
-        descripcion_productos = ", ".join([
-            f"{d['nombre']} x{d['cantidad']}{' ' + d['unidad'] if d['unidad'] else ''}"
-            for d in detalles
-        ])
 
-        ventas_con_detalles.append({
-            "id": venta["id"],
-            "fecha": venta["fecha"],
-            "total": venta["total"],
-            "productos": descripcion_productos
-        })
+class _FlowablesPerezosos(list):
+    """
+    Lista de flowables que se rellena desde un generador cuando se está por vaciar.
+    BaseDocTemplate.build consulta len() antes de cada flowable.
+    """
 
-    # Memoria
-    mem = io.BytesIO()
-    pdf = SimpleDocTemplate(mem, pagesize=letter)
+    def __init__(self, iniciales, generador):
+        super().__init__(iniciales)
+        self._generador = generador
 
-    styles = getSampleStyleSheet()
-    elementos = []
+    def __len__(self):
+        if self._generador is not None and list.__len__(self) < 2:
+            siguiente = next(self._generador, None)
+            if siguiente is None:
+                self._generador = None
+            else:
+                self.append(siguiente)
+        return list.__len__(self)
 
-    # Título
-    titulo = Paragraph("<b>Reporte de Ventas</b>", styles["Title"])
-    elementos.append(titulo)
-    elementos.append(Spacer(1, 20))
 
-    # Información de filtros aplicados
+def _filtros_pdf(db, args):
+    """Texto de los filtros aplicados para el encabezado del PDF."""
     filtros_info = []
-    if request.args.get("fecha_desde"):
-        filtros_info.append(f"Desde: {request.args.get('fecha_desde')}")
-    if request.args.get("fecha_hasta"):
-        filtros_info.append(f"Hasta: {request.args.get('fecha_hasta')}")
-    if request.args.get("precio_min"):
-        filtros_info.append(f"Precio mín: ${request.args.get('precio_min')}")
-    if request.args.get("precio_max"):
-        filtros_info.append(f"Precio máx: ${request.args.get('precio_max')}")
-
-    prod_ids = request.args.getlist("producto")
+    if args.get("fecha_desde"):
+        filtros_info.append(f"Desde: {args.get('fecha_desde')}")
+    if args.get("fecha_hasta"):
+        filtros_info.append(f"Hasta: {args.get('fecha_hasta')}")
+    if args.get("precio_min"):
+        filtros_info.append(f"Precio mín: ${args.get('precio_min')}")
+    if args.get("precio_max"):
+        filtros_info.append(f"Precio máx: ${args.get('precio_max')}")
+
+    prod_ids = args.getlist("producto")
     if prod_ids:
         productos_nombres = db.execute(f"SELECT nombre FROM productos WHERE id IN ({','.join(['?']*len(prod_ids))})", prod_ids).fetchall()
         if productos_nombres:
             nombres = [p["nombre"] for p in productos_nombres]
             filtros_info.append(f"Productos: {', '.join(nombres)}")
 
-    cat_ids = request.args.getlist("categoria")
+    cat_ids = args.getlist("categoria")
     if cat_ids:
         categorias_nombres = db.execute(f"SELECT nombre FROM categorias WHERE id IN ({','.join(['?']*len(cat_ids))})", cat_ids).fetchall()
         if categorias_nombres:
             nombres = [c["nombre"] for c in categorias_nombres]
             filtros_info.append(f"Categorías: {', '.join(nombres)}")
 
-    uni_ids = request.args.getlist("unidad")
+    uni_ids = args.getlist("unidad")
     if uni_ids:
         unidades_nombres = db.execute(f"SELECT nombre FROM unidades WHERE id IN ({','.join(['?']*len(uni_ids))})", uni_ids).fetchall()
         if unidades_nombres:
             nombres = [u["nombre"] for u in unidades_nombres]
             filtros_info.append(f"Unidades: {', '.join(nombres)}")
 
-    if filtros_info:
-        filtros_texto = "Filtros aplicados: " + " | ".join(filtros_info)
-        filtros_paragraph = Paragraph(f"<i>{filtros_texto}</i>", styles["Normal"])
-        elementos.append(filtros_paragraph)
-        elementos.append(Spacer(1, 10))
+    return filtros_info
 
-    # Encabezados de tabla
-    data = [["ID", "Fecha", "Productos", "Total"]]
 
-    # Datos
-    for v in ventas_con_detalles:
-        data.append([
-            v["id"],
-            v["fecha"],
-            v["productos"],
-            f"${v['total']}"
-        ])
-
-    # Tabla
-    tabla = Table(data, colWidths=[40, 80, 300, 80])
+def _tablas_ventas(cursor, db, filas_por_tabla):
+    """Genera una Table de reportlab por cada bloque de ventas leído del cursor."""
+    from reportlab.lib import colors
+    from reportlab.platypus import Table, TableStyle
 
-    tabla.setStyle(TableStyle([
+    estilo = TableStyle([
         ("BACKGROUND", (0, 0), (-1, 0), colors.grey),
         ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
         ("ALIGN", (0, 0), (-1, -1), "CENTER"),
@@ -214,15 +258,235 @@ def export_pdf():
 
         # Bordes
         ("GRID", (0, 0), (-1, -1), 0.5, colors.black),
-    ]))
+    ])
+
+    while True:
+        ventas = cursor.fetchmany(filas_por_tabla)
+        if not ventas:
+            break
+
+        # Detalles de productos del bloque en una sola pasada
+        detalles = detalles_por_venta(db, [v["id"] for v in ventas])
+
+        # Encabezados de tabla
+        data = [["ID", "Fecha", "Productos", "Total"]]
+        for venta in ventas:
+            # Crear descripción de productos (ordenados por nombre)
+            descripcion_productos = describir_detalles(
+                sorted(detalles[venta["id"]], key=lambda d: d["nombre"]), con_unidad=True
+            )
+            data.append([
+                venta["id"],
+                venta["fecha"],
+                descripcion_productos,
+                f"${venta['total']}"
+            ])
+
+        tabla = Table(data, colWidths=[40, 80, 300, 80], repeatRows=1)
+        tabla.setStyle(estilo)
+        yield tabla
+
+
+def escribir_pdf_ventas(db, args, destino, filas_por_tabla=PDF_FILAS_TABLA):
+    """
+    Escribe en `destino` (archivo binario) el reporte de ventas con los filtros de `args`
+    (un MultiDict, como request.args).
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer
+    from reportlab.lib.styles import getSampleStyleSheet
 
-    elementos.append(tabla)
+    # Construir la misma consulta que usa la vista de reportes para respetar filtros
+    sql, params, _ = _build_ventas_query(args, limit=None)
+    cursor = db.execute(f"SELECT id, fecha, total FROM ({sql})", params)
 
-    # Generar PDF
-    pdf.build(elementos)
-    mem.seek(0)
+    pdf = SimpleDocTemplate(destino, pagesize=letter)
+    styles = getSampleStyleSheet()
+    elementos = []
+
+    # Título
+    titulo = Paragraph("<b>Reporte de Ventas</b>", styles["Title"])
+    elementos.append(titulo)
+    elementos.append(Spacer(1, 20))
+
+    # Información de filtros aplicados
+    filtros_info = _filtros_pdf(db, args)
+    if filtros_info:
+        filtros_texto = "Filtros aplicados: " + " | ".join(filtros_info)
+        filtros_paragraph = Paragraph(f"<i>{filtros_texto}</i>", styles["Normal"])
+        elementos.append(filtros_paragraph)
+        elementos.append(Spacer(1, 10))
+
+    # Las tablas se van pidiendo al cursor durante el build
+    pdf.build(_FlowablesPerezosos(elementos, _tablas_ventas(cursor, db, filas_por_tabla)))
+
+
+@reportes_bp.route("/export/pdf")
+@login_required
+def export_pdf():
+    archivo = tempfile.SpooledTemporaryFile(max_size=PDF_SPOOL_MAX)
+    escribir_pdf_ventas(get_db(), request.args, archivo)
+    archivo.seek(0)
+
+    return send_file(archivo, mimetype="application/pdf", download_name="reporte.pdf", as_attachment=True)
+
+# -----------------------
+# Export CSV en streaming
+# -----------------------
+# Sin límite de filas: recorre el cursor con fetchmany y va emitiendo el archivo por
+# partes, así la memoria no crece con el historial. Respeta los mismos filtros que la vista.
+# CROSS JOIN obliga a SQLite a recorrer las ventas por idx_ventas_fecha y buscar sus
+# líneas por índice, en vez de ordenar todo el resultado en un B-tree temporal.
+
+CSV_LOTE = 500
+
+EXPORTS_CSV = {
+    "ventas": (
+        ["venta_id", "fecha", "total"],
+        "SELECT id, fecha, total FROM filtradas ORDER BY fecha DESC, id DESC",
+    ),
+    "lineas": (
+        ["venta_id", "fecha", "producto_id", "producto", "unidad", "cantidad", "subtotal"],
+        """
+        SELECT v.id, v.fecha, d.producto_id, p.nombre, u.nombre, d.cantidad, d.subtotal
+        FROM filtradas v
+        CROSS JOIN detalle_ventas d ON d.venta_id = v.id
+        JOIN productos p ON d.producto_id = p.id
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        ORDER BY v.fecha DESC, v.id DESC, d.id
+        """,
+    ),
+    "pagos": (
+        ["venta_id", "fecha", "metodo", "monto"],
+        """
+        SELECT v.id, v.fecha, m.nombre, dp.monto
+        FROM filtradas v
+        CROSS JOIN detalle_pago dp ON dp.venta_id = v.id
+        JOIN metodos_pago m ON dp.metodo_id = m.id
+        ORDER BY v.fecha DESC, v.id DESC, dp.id
+        """,
+    ),
+}
+
+
+def _generar_csv(cursor, encabezado):
+    """Genera el CSV en texto de a lotes de filas (con BOM para que Excel detecte UTF-8)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    buffer.write("\ufeff")
+    writer.writerow(encabezado)
+    while True:
+        filas = cursor.fetchmany(CSV_LOTE)
+        if not filas:
+            break
+        writer.writerows(filas)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _comprimir(partes):
+    """Comprime al vuelo en formato gzip."""
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for parte in partes:
+        datos = compresor.compress(parte.encode("utf-8"))
+        if datos:
+            yield datos
+    yield compresor.flush()
+
+
+def generar_csv_ventas(db, args, nivel):
+    """Genera el CSV del `nivel` pedido con los filtros de `args`, por partes de texto."""
+    encabezado, select = EXPORTS_CSV[nivel]
+    sql, params, _ = _build_ventas_query(args, limit=None)
+    cursor = db.execute(f"""
+        WITH filtradas AS ({sql})
+        {select}
+    """, params)
+    return _generar_csv(cursor, encabezado)
+
+
+@reportes_bp.route("/export/csv")
+@login_required
+def export_csv():
+    nivel = request.args.get("nivel", "ventas")
+    if nivel not in EXPORTS_CSV:
+        return jsonify({"error": "nivel inválido"}), 400
+
+    nombre = f"ventas_{nivel}_{datetime.date.today().isoformat()}.csv"
+    partes = generar_csv_ventas(get_db(), request.args, nivel)
+
+    if request.args.get("gzip"):
+        return Response(
+            stream_with_context(_comprimir(partes)),
+            mimetype="application/gzip",
+            headers={"Content-Disposition": f"attachment; filename={nombre}.gz"}
+        )
+
+    return Response(
+        stream_with_context(partes),
+        mimetype="text/csv",
+        headers={"Content-Disposition": f"attachment; filename={nombre}"}
+    )
+
+
+# -----------------------
+# Reportes en segundo plano
+# -----------------------
+
+def _trabajo_json(t):
+    return {
+        "id": t["id"],
+        "tipo": t["tipo"],
+        "estado": t["estado"],
+        "error": t["error"],
+        "creado_en": t["creado_en"],
+        "terminado_en": t["terminado_en"],
+        "estado_url": url_for("reportes.estado_trabajo", id=t["id"]),
+        "descarga_url": url_for("reportes.descargar_trabajo", id=t["id"]) if t["estado"] == "listo" else None,
+    }
+
+
+@reportes_bp.route("/jobs", methods=["POST"])
+@login_required
+def nuevo_trabajo():
+    """Encola un reporte pesado con los mismos filtros que la vista (tipo=ventas_pdf|ventas_csv|ganancias_netas)."""
+    tipo = request.values.get("tipo")
+    if tipo not in TIPOS:
+        return jsonify({"error": "tipo inválido"}), 400
+    if tipo == "ventas_csv" and request.values.get("nivel", "ventas") not in EXPORTS_CSV:
+        return jsonify({"error": "nivel inválido"}), 400
+
+    trabajo = encolar_trabajo(get_db(), tipo, request.values)
+    return jsonify(_trabajo_json(trabajo)), 202
+
+
+@reportes_bp.route("/jobs/<id>")
+@login_required
+def estado_trabajo(id):
+    trabajo = obtener_trabajo(get_db(), id)
+    if not trabajo:
+        return jsonify({"error": "trabajo no encontrado"}), 404
+    return jsonify(_trabajo_json(trabajo))
+
+
+@reportes_bp.route("/jobs/<id>/descargar")
+@login_required
+def descargar_trabajo(id):
+    trabajo = obtener_trabajo(get_db(), id)
+    if not trabajo:
+        return jsonify({"error": "trabajo no encontrado"}), 404
+    if trabajo["estado"] != "listo":
+        return jsonify(_trabajo_json(trabajo)), 409
+
+    extension, mimetype = TIPOS[trabajo["tipo"]]
+    return send_file(trabajo["archivo"], mimetype=mimetype,
+                     download_name=f"{trabajo['tipo']}.{extension}", as_attachment=True)
 
-    return send_file(mem, download_name="reporte.pdf", as_attachment=True)
 
 @reportes_bp.route("/dashboard")
 @login_required
@@ -230,6 +494,16 @@ def dashboard():
     return render_template("reportes/dashboard.html")
 
 
+@reportes_bp.route("/stream")
+@login_required
+def stream():
+    """Server-Sent Events para el dashboard (ver app/utils/eventos.py)."""
+    cuerpo = flujo(current_app.config["EVENTOS_HEARTBEAT"], current_app.config["EVENTOS_COLA_MAX"])
+    return Response(cuerpo, mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # que un proxy (nginx) no lo acumule
+    })
+
 @reportes_bp.route("/venta/<int:id>")
 @login_required
 def ver_venta(id):
@@ -240,16 +514,10 @@ def ver_venta(id):
         flash("Venta no encontrada", "danger")
         return redirect(url_for("reportes.index"))
 
-    detalles = db.execute("""
-        SELECT d.*, p.nombre, u.nombre as unidad
-        FROM detalle_ventas d
-        JOIN productos p ON d.producto_id = p.id
-        LEFT JOIN unidades u ON p.unidad_id = u.id
-        WHERE d.venta_id = ?
-    """, (id,)).fetchall()
+    detalles = detalles_por_venta(db, [id])[id]
 
     # Crear descripción breve
-    descripcion = ", ".join([f"{r['nombre']} x{r['cantidad']}" for r in detalles])
+    descripcion = describir_detalles(detalles)
 
     return render_template("reportes/ver_venta.html", venta=venta, detalles=detalles, descripcion=descripcion)
 
@@ -269,14 +537,8 @@ def venta_pdf(id):
         flash("Venta no encontrada", "danger")
         return redirect(url_for("reportes.index"))
 
-    detalles = db.execute("""
-        SELECT d.*, p.nombre
-        FROM detalle_ventas d
-        JOIN productos p ON d.producto_id = p.id
-        WHERE d.venta_id = ?
-    """, (id,)).fetchall()
-
-    descripcion = ", ".join([f"{r['nombre']} x{r['cantidad']}" for r in detalles])
+    detalles = detalles_por_venta(db, [id])[id]
+    descripcion = describir_detalles(detalles)
 
     mem = io.BytesIO()
     pdf = SimpleDocTemplate(mem, pagesize=letter)
@@ -294,54 +556,60 @@ def venta_pdf(id):
 
 @reportes_bp.route("/data")
 @login_required
+@cacheado()
 def data():
     db = get_db()
 
+    # Desde los resúmenes diarios (app/utils/resumenes.py): no recorre el historial de ventas
     ventas = db.execute("""
-        SELECT substr(fecha,1,10) AS dia, SUM(total) AS total
-        FROM ventas
-        GROUP BY dia
+        SELECT dia, total
+        FROM resumen_ventas_diarias
         ORDER BY dia ASC
     """).fetchall()
 
     top = db.execute("""
-        SELECT p.nombre, SUM(d.cantidad) AS cantidad
-        FROM detalle_ventas d
-        JOIN productos p ON d.producto_id=p.id
-        GROUP BY p.id
+        SELECT p.nombre, SUM(r.cantidad) AS cantidad
+        FROM resumen_ventas_productos r
+        JOIN productos p ON r.producto_id=p.id
+        GROUP BY r.producto_id
         ORDER BY cantidad DESC
         LIMIT 7
     """).fetchall()
 
+    pagos = db.execute("""
+        SELECT m.nombre, SUM(r.monto) AS monto
+        FROM resumen_ventas_pagos r
+        JOIN metodos_pago m ON r.metodo_id=m.id
+        GROUP BY r.metodo_id
+        ORDER BY monto DESC
+    """).fetchall()
+
     return jsonify({
         "ventas": [{"dia": r["dia"], "total": r["total"]} for r in ventas],
-        "top": [{"nombre": t["nombre"], "cantidad": t["cantidad"]} for t in top]
+        "top": [{"nombre": t["nombre"], "cantidad": t["cantidad"]} for t in top],
+        "pagos": [{"metodo": p["nombre"], "monto": p["monto"]} for p in pagos]
     })
 
 
-@reportes_bp.route("/ganancias_netas")
-@login_required
-def ganancias_netas():
+def calcular_ganancias_netas(db):
     """
     Calcula ganancias netas diarias: total de ventas - costo total.
-    El costo se estima como: suma de (cantidad * precio_unitario_ingreso) para cada producto vendido.
+    El costo de cada línea se guarda al vender (lotes FIFO o costo promedio, según
+    COSTO_METODO); acá solo se suman los resúmenes diarios.
     """
-    db = get_db()
 
-    # Obtener ventas diarias y sus costos
     resultado = db.execute("""
         SELECT
-            substr(v.fecha,1,10) AS dia,
-            SUM(v.total) AS venta_total,
-            COALESCE(SUM(d.cantidad * COALESCE((
-                SELECT AVG(i.precio_unitario)
-                FROM ingresos_stock i
-                WHERE i.producto_id = d.producto_id
-            ), 0)), 0) AS costo_total
-        FROM ventas v
-        LEFT JOIN detalle_ventas d ON v.id = d.venta_id
-        GROUP BY dia
-        ORDER BY dia ASC
+            d.dia,
+            d.total AS venta_total,
+            COALESCE(c.costo, 0) AS costo_total
+        FROM resumen_ventas_diarias d
+        LEFT JOIN (
+            SELECT dia, SUM(costo) AS costo
+            FROM resumen_ventas_productos
+            GROUP BY dia
+        ) c ON c.dia = d.dia
+        ORDER BY d.dia ASC
     """).fetchall()
 
     data_list = []
@@ -354,11 +622,19 @@ def ganancias_netas():
             "ganancia": ganancia
         })
 
-    return jsonify(data_list)
+    return data_list
+
+
+@reportes_bp.route("/ganancias_netas")
+@login_required
+@cacheado()
+def ganancias_netas():
+    return jsonify(calcular_ganancias_netas(get_db()))
 
 
 @reportes_bp.route("/top_proveedores")
 @login_required
+@cacheado()
 def top_proveedores():
     """
     Retorna top 10 proveedores más baratos por producto.
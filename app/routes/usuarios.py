@@ -1,5 +1,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, session, flash
+import sqlite3
 from db import get_db, hash_pass
+from app.utils.carritos import eliminar_activos_del_usuario
 from app.utils.auth_decorators import login_required, admin_required
 
 usuarios_bp = Blueprint("usuarios", __name__, url_prefix="/usuarios")
@@ -78,8 +80,15 @@ def editar(user_id):
 @admin_required
 def eliminar(user_id):
     db = get_db()
-    db.execute("DELETE FROM usuarios WHERE id=?", (user_id,))
-    db.commit()
+    try:
+        # Los carritos activos quedan de sesiones sin cerrar; los aparcados sí bloquean el borrado
+        eliminar_activos_del_usuario(db, user_id)
+        db.execute("DELETE FROM usuarios WHERE id=?", (user_id,))
+        db.commit()
+    except sqlite3.IntegrityError:
+        db.rollback()
+        flash("No se puede eliminar: el usuario tiene carritos aparcados", "danger")
+        return redirect(url_for("usuarios.index"))
 
     flash("Usuario eliminado", "success")
     return redirect(url_for("usuarios.index"))
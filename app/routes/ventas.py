@@ -1,27 +1,114 @@
-from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify
-from db import get_db
-import datetime
-from datetime import timedelta
+from flask import Blueprint, render_template, request, redirect, url_for, flash, session, jsonify, current_app
+from db import get_db, transaccion
+import sqlite3
 from app.utils.auth_decorators import login_required
-from app.routes.productos import calcular_precio_con_oferta
+from app.routes.productos import calcular_precios_lote
+from app.utils.carritos import (crear_carrito, obtener_carrito, agregar_linea, quitar_linea, eliminar_carrito,
+                                aparcar_carrito, listar_aparcados, retomar_carrito, guardar_precios)
+from app.utils.resumenes import registrar_venta, cambios_del_dia
+from app.utils.costos import costear_lineas
+from app.utils import fechas
+from app.utils.cache import invalidar_cache
+from app.utils.eventos import hay_suscriptores, publicar
 
 ventas_bp = Blueprint("ventas", __name__, url_prefix="/ventas")
 
+# Cache nombre -> id de metodos_pago (la tabla casi nunca cambia)
+_metodos_pago_ids = {}
+
+class StockInsuficiente(Exception):
+    pass
+
+class CarritoNoEncontrado(Exception):
+    pass
+
 def get_adjusted_datetime():
     """
-    Retorna la hora actual ajustada por -4 horas (zona Argentina UTC-3).
-    El servidor está en USA West (UTC-7), así que restamos 4 horas.
+    Retorna la hora actual del negocio (zona Argentina UTC-3).
+    El ajuste vive en app/utils/fechas.py.
+    """
+    return fechas.ahora()
+
+def _metodo_pago_id(db, nombre):
+    """Busca el id de un método de pago en el cache; solo va a la base si no lo conoce."""
+    global _metodos_pago_ids
+    metodos = _metodos_pago_ids
+    if nombre not in metodos:
+        # Se arma un dict nuevo y se reemplaza de una vez: otro hilo nunca ve el cache vacío
+        metodos = {m["nombre"]: m["id"] for m in db.execute("SELECT id, nombre FROM metodos_pago")}
+        _metodos_pago_ids = metodos
+    return metodos.get(nombre)
+
+def _productos_sin_stock(db, carrito):
+    """Nombres de los productos del carrito cuya cantidad total supera el stock disponible."""
+    requerido = {}
+    for i in carrito:
+        requerido[i["producto_id"]] = requerido.get(i["producto_id"], 0) + i["cantidad"]
+
+    placeholders = ",".join(["?"] * len(requerido))
+    productos = db.execute(f"""
+        SELECT id, nombre, stock - stock_defectuoso AS stock_disponible
+        FROM productos WHERE id IN ({placeholders})
+    """, list(requerido)).fetchall()
+    return [p["nombre"] for p in productos if requerido[p["id"]] > p["stock_disponible"]]
+
+def recalcular_carrito(db, carrito):
     """
-    return datetime.datetime.now() - timedelta(hours=4)
+    Vuelve a calcular los precios de todo el carrito en bloque
+    (por si una oferta empezó o terminó en medio de la venta).
+    Retorna copias de las líneas: las del cache de carritos no se modifican.
+    """
+    precios = calcular_precios_lote(db, [(i["producto_id"], i["cantidad"]) for i in carrito])
+    recalculado = []
+    for item in carrito:
+        item = dict(item)
+        info = precios.get(item["producto_id"])
+        if info:
+            item["precio"] = info["precio_final"]
+            item["precio_original"] = info["precio_original"]
+            item["subtotal"] = info["precio_final"] * item["cantidad"]
+            item["tiene_oferta"] = info["tipo_oferta"] is not None
+            item["descuento_aplicado"] = info["descuento_aplicado"]
+            item["descripcion_oferta"] = info["descripcion_oferta"]
+        recalculado.append(item)
+    return recalculado
+
+def _guardar_si_cambio(db, carrito_id, guardado, recalculado):
+    """Si algún subtotal cambió lo guarda en la base, así el total es el mismo en todos los workers."""
+    if any(a["subtotal"] != b["subtotal"] for a, b in zip(guardado, recalculado)):
+        guardar_precios(db, carrito_id, recalculado)
+        db.commit()
+
+def _actualizar_precios(db, carrito_id, carrito):
+    """Recalcula el carrito, guarda los precios si cambiaron y retorna las líneas recalculadas."""
+    recalculado = recalcular_carrito(db, carrito)
+    _guardar_si_cambio(db, carrito_id, carrito, recalculado)
+    return recalculado
+
+def _carrito_actual(db, crear=False):
+    """
+    Retorna (carrito_id, lineas) del carrito de la sesión.
+    La sesión solo guarda el id; si no hay carrito se crea uno cuando `crear` es True.
+    """
+    carrito_id = session.get("carrito_id")
+    if carrito_id:
+        lineas = obtener_carrito(db, carrito_id)
+        if lineas is not None:
+            return carrito_id, lineas
+
+    if not crear:
+        session.pop("carrito_id", None)
+        return None, []
+
+    carrito_id = crear_carrito(db, session["user_id"])
+    session["carrito_id"] = carrito_id
+    return carrito_id, []
 
 @ventas_bp.route("/nueva", methods=["GET", "POST"])
 @login_required
 def nueva():
     db = get_db()
 
-    if "carrito" not in session:
-        session["carrito"] = []
-
     if request.method == "POST":
         # leer el id del hidden y la cantidad
         producto_id = request.form.get("producto_id")
@@ -52,58 +139,150 @@ def nueva():
             flash(f"Stock insuficiente. Disponible: {stock_disponible}", "danger")
             return redirect(url_for("ventas.nueva"))
 
-        # Calcular precio con oferta aplicada
-        info_precio = calcular_precio_con_oferta(db, producto_id, cantidad)
-        precio_final = info_precio["precio_final"]
-        subtotal = precio_final * cantidad
-
         # Traer unidad
         unidad = db.execute("SELECT nombre FROM unidades WHERE id=?", (producto["unidad_id"],)).fetchone()
         unidad_nombre = unidad["nombre"] if unidad else ""
 
-        session["carrito"].append({
+        item = {
             "producto_id": producto_id,
             "nombre": producto["nombre"],
             "cantidad": cantidad,
-            "precio": precio_final,
-            "precio_original": info_precio["precio_original"],
-            "subtotal": subtotal,
+            "precio": producto["precio"],
+            "precio_original": producto["precio"],
+            "subtotal": producto["precio"] * cantidad,
             "stock_disponible": producto["stock"] - producto["stock_defectuoso"],
             "unidad": unidad_nombre,
-            "tiene_oferta": info_precio["tipo_oferta"] is not None,
-            "descuento_aplicado": info_precio["descuento_aplicado"],
-            "descripcion_oferta": info_precio["descripcion_oferta"]
-        })
-        session.modified = True
+            "tiene_oferta": False,
+            "descuento_aplicado": 0,
+            "descripcion_oferta": None
+        }
+        # La línea se guarda ya con el precio de oferta; sumar esta cantidad puede
+        # cambiar también el precio de las otras líneas del mismo producto
+        carrito_id, lineas = _carrito_actual(db, crear=True)
+        carrito = recalcular_carrito(db, lineas + [item])
+        lineas = agregar_linea(db, carrito_id, carrito[-1])
+        carrito[-1] = item = lineas[-1]
+        _guardar_si_cambio(db, carrito_id, lineas, carrito)
         flash(f"Producto agregado: {producto['nombre']}", "success")
-        if info_precio["tipo_oferta"]:
-            flash(f"Oferta aplicada: {info_precio['descripcion_oferta']}", "info")
+        if item["tiene_oferta"]:
+            flash(f"Oferta aplicada: {item['descripcion_oferta']}", "info")
+    else:
+        carrito_id, carrito = _carrito_actual(db)
+        carrito = _actualizar_precios(db, carrito_id, carrito)
 
-    total = sum(i["subtotal"] for i in session.get("carrito", []))
+    total = sum(i["subtotal"] for i in carrito)
 
     return render_template("ventas/nueva.html",
-                           carrito=session.get("carrito", []),
+                           carrito=carrito,
                            total=total)
 
 @ventas_bp.route("/quitar/<int:idx>")
 @login_required
 def quitar(idx):
-    if "carrito" in session and 0 <= idx < len(session["carrito"]):
-        session["carrito"].pop(idx)
-        session.modified = True
+    db = get_db()
+    carrito_id, _ = _carrito_actual(db)
+    if carrito_id and quitar_linea(db, carrito_id, idx):
         flash("Producto removido del carrito", "info")
     return redirect(url_for("ventas.nueva"))
 
+# -----------------------
+# Carritos aparcados
+# -----------------------
+
+@ventas_bp.route("/aparcar", methods=["POST"])
+@login_required
+def aparcar():
+    db = get_db()
+    carrito_id, carrito = _carrito_actual(db)
+    if not carrito:
+        flash("No hay nada para aparcar", "warning")
+        return redirect(url_for("ventas.nueva"))
+
+    nombre = request.form.get("nombre", "").strip() or f"En espera {get_adjusted_datetime().strftime('%H:%M')}"
+    # El total que muestra la lista de aparcados es el que se va a cobrar al retomar
+    with transaccion(db):
+        guardar_precios(db, carrito_id, recalcular_carrito(db, carrito))
+        aparcar_carrito(db, carrito_id, nombre)
+    session.pop("carrito_id", None)
+    session["metodos_pago_session"] = []
+
+    flash(f"Carrito aparcado: {nombre}", "info")
+    return redirect(url_for("ventas.nueva"))
+
+@ventas_bp.route("/aparcados")
+@login_required
+def aparcados():
+    db = get_db()
+    carritos = listar_aparcados(db, session["user_id"])
+    return render_template("ventas/aparcados.html", carritos=carritos)
+
+@ventas_bp.route("/retomar/<int:id>", methods=["POST"])
+@login_required
+def retomar(id):
+    db = get_db()
+
+    try:
+        with transaccion(db):
+            # Si hay una venta en curso la dejamos en espera (o la borramos si está vacía)
+            actual_id, actual = _carrito_actual(db)
+            if actual_id and actual:
+                guardar_precios(db, actual_id, recalcular_carrito(db, actual))
+                aparcar_carrito(db, actual_id, f"En espera {get_adjusted_datetime().strftime('%H:%M')}")
+            elif actual_id:
+                eliminar_carrito(db, actual_id)
+
+            # Si no está, la excepción hace que transaccion deshaga lo anterior
+            lineas = retomar_carrito(db, id, session["user_id"])
+            if lineas is None:
+                raise CarritoNoEncontrado()
+
+            # Recalcular precios en bloque y revalidar stock contra lo que hay ahora
+            lineas = recalcular_carrito(db, lineas)
+            guardar_precios(db, id, lineas)
+
+            requerido = {}
+            for i in lineas:
+                requerido[i["producto_id"]] = requerido.get(i["producto_id"], 0) + i["cantidad"]
+            sin_stock = sorted({i["nombre"] for i in lineas if requerido[i["producto_id"]] > i["stock_disponible"]})
+    except CarritoNoEncontrado:
+        flash("Carrito no encontrado", "danger")
+        return redirect(url_for("ventas.aparcados"))
+
+    session["carrito_id"] = id
+    session["metodos_pago_session"] = []
+
+    flash("Carrito retomado", "success")
+    if sin_stock:
+        flash(f"Stock insuficiente para: {', '.join(sin_stock)}", "warning")
+    return redirect(url_for("ventas.nueva"))
+
+@ventas_bp.route("/aparcados/<int:id>/descartar", methods=["POST"])
+@login_required
+def descartar(id):
+    db = get_db()
+    carrito = db.execute("""
+        SELECT id FROM carritos_pendientes
+        WHERE id = ? AND usuario_id = ? AND estado = 'aparcado'
+    """, (id, session["user_id"])).fetchone()
+    if carrito:
+        eliminar_carrito(db, id)
+        db.commit()
+        flash("Carrito descartado", "info")
+    return redirect(url_for("ventas.aparcados"))
+
 @ventas_bp.route("/finalizar", methods=["GET", "POST"])
 @login_required
 def finalizar():
     db = get_db()
 
-    carrito = session.get("carrito", [])
+    carrito_id, carrito = _carrito_actual(db)
     if not carrito:
         flash("Carrito vacío", "warning")
         return redirect(url_for("ventas.nueva"))
 
+    # Cobrar siempre con los precios vigentes al momento de finalizar
+    carrito = _actualizar_precios(db, carrito_id, carrito)
+
     total = sum(i["subtotal"] for i in carrito)
 
     # Inicializar métodos de pago en sesión
@@ -120,37 +299,71 @@ def finalizar():
             flash(f"El monto total no coincide. Total: ${total}, Pagado: ${monto_total_pago}", "danger")
             return redirect(url_for("ventas.finalizar"))
 
-        # Crear venta
-        fecha = get_adjusted_datetime().strftime("%Y-%m-%d %H:%M")
-        cur = db.cursor()
-        cur.execute("INSERT INTO ventas(fecha, total) VALUES (?, ?)", (fecha, total))
-        venta_id = cur.lastrowid
-
-        # Detalles de ventas
-        for i in carrito:
-            cur.execute("""
-            INSERT INTO detalle_ventas(venta_id, producto_id, cantidad, subtotal)
-            VALUES (?, ?, ?, ?)
-            """, (venta_id, i["producto_id"], i["cantidad"], i["subtotal"]))
-
-            # Actualizar stock
-            cur.execute("UPDATE productos SET stock = stock - ? WHERE id=?", (i["cantidad"], i["producto_id"]))
-
-        # Registrar métodos de pago
+        fecha = get_adjusted_datetime().strftime(fechas.FORMATO)
+        pagos = []
         for pago in metodos_pago:
-            metodo = db.execute("SELECT id FROM metodos_pago WHERE nombre = ?", (pago["metodo"],)).fetchone()
-            if metodo:
-                cur.execute("""
+            metodo_id = _metodo_pago_id(db, pago["metodo"])
+            if metodo_id:
+                pagos.append((metodo_id, pago["monto"]))
+
+        # Toda la venta en una sola transacción: si falta stock no queda nada a medias
+        try:
+            with transaccion(db):
+                cur = db.execute("INSERT INTO ventas(fecha, total) VALUES (?, ?)", (fecha, total))
+                venta_id = cur.lastrowid
+
+                # Descontar stock solo si alcanza (otra caja pudo haber vendido lo mismo)
+                cur = db.executemany("""
+                    UPDATE productos
+                    SET stock = stock - ?
+                    WHERE id = ? AND stock - stock_defectuoso >= ?
+                """, [(i["cantidad"], i["producto_id"], i["cantidad"]) for i in carrito])
+                if cur.rowcount != len(carrito):
+                    raise StockInsuficiente()
+
+                # Costo de cada línea consumiendo los lotes de inventario (FIFO)
+                costos = costear_lineas(
+                    db, [(i["producto_id"], i["cantidad"]) for i in carrito],
+                    current_app.config.get("COSTO_METODO", "fifo")
+                )
+
+                db.executemany("""
+                    INSERT INTO detalle_ventas(venta_id, producto_id, cantidad, subtotal, costo)
+                    VALUES (?, ?, ?, ?, ?)
+                """, [(venta_id, i["producto_id"], i["cantidad"], i["subtotal"], costo)
+                      for i, costo in zip(carrito, costos)])
+
+                db.executemany("""
                     INSERT INTO detalle_pago (venta_id, metodo_id, monto)
                     VALUES (?, ?, ?)
-                """, (venta_id, metodo["id"], pago["monto"]))
-
-        db.commit()
+                """, [(venta_id, metodo_id, monto) for metodo_id, monto in pagos])
+
+                registrar_venta(
+                    db, fecha, total,
+                    [(i["producto_id"], i["cantidad"], i["subtotal"], costo)
+                     for i, costo in zip(carrito, costos)],
+                    pagos
+                )
+
+                # El carrito ya es una venta: se borra en la misma transacción
+                eliminar_carrito(db, carrito_id)
+        except StockInsuficiente:
+            flash(f"Stock insuficiente para: {', '.join(_productos_sin_stock(db, carrito))}", "danger")
+            return redirect(url_for("ventas.nueva"))
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e):
+                raise
+            flash("La base de datos está ocupada, intentá de nuevo.", "warning")
+            return redirect(url_for("ventas.finalizar"))
+        invalidar_cache()
+        # Dashboards abiertos: solo lo que cambió, ya confirmado
+        if hay_suscriptores():
+            publicar("venta", cambios_del_dia(db, fecha[:10], {i["producto_id"] for i in carrito}))
 
         ticket = list(carrito)
         metodos_pago_ticket = list(metodos_pago)
 
-        session["carrito"] = []
+        session.pop("carrito_id", None)
         session["metodos_pago_session"] = []
         session.modified = True
 
@@ -1,5 +1,115 @@
-// Autocompletar - archivo: static/js/main.js (reemplazar la sección correspondiente)
+// Catálogo local: copia de /productos/catalogo guardada en localStorage.
+// Se revalida con ?since=<version> + ETag, así cada tecla busca sin ir al servidor.
+const catalogoLocal = {
+    version: null,
+    productos: new Map(),
+
+    cargarGuardado() {
+        try {
+            const guardado = JSON.parse(localStorage.getItem("catalogo") || "null");
+            if (guardado) {
+                this.version = guardado.version;
+                this.productos = new Map(guardado.productos.map(p => [p[0], p]));
+            }
+        } catch (err) {
+            localStorage.removeItem("catalogo");
+        }
+    },
+
+    guardar() {
+        try {
+            localStorage.setItem("catalogo", JSON.stringify({
+                version: this.version,
+                productos: Array.from(this.productos.values())
+            }));
+        } catch (err) {
+            // Sin lugar en localStorage: el catálogo queda solo en memoria
+        }
+    },
+
+    async sincronizar() {
+        const url = this.version === null ? "/productos/catalogo" : `/productos/catalogo?since=${this.version}`;
+        const res = await fetch(url, {cache: "no-cache"});
+        if (res.status === 304 || !res.ok) return;
+
+        const data = await res.json();
+        if (data.completo) this.productos = new Map();
+        data.productos.forEach(p => this.productos.set(p[0], p));
+        data.eliminados.forEach(id => this.productos.delete(id));
+        this.version = data.version;
+        this.guardar();
+    },
+
+    listo() {
+        return this.version !== null;
+    },
+
+    stock(id) {
+        const p = this.productos.get(Number(id));
+        return p ? p[4] : null;
+    },
+
+    buscar(q, cantidad = 1) {
+        const terminos = normalizar(q).split(/[^a-z0-9ñ]+/).filter(Boolean);
+        if (!terminos.length) return [];
+
+        const id = Number(q);
+        if (Number.isInteger(id) && this.productos.has(id)) {
+            return [this.item(this.productos.get(id), cantidad)];
+        }
+
+        const resultados = [];
+        for (const p of this.productos.values()) {
+            const palabras = normalizar(p[1]).split(/[^a-z0-9ñ]+/);
+            if (terminos.every(t => palabras.some(w => w.startsWith(t)))) resultados.push(p);
+        }
+        resultados.sort((a, b) => a[1].length - b[1].length);
+        return resultados.slice(0, 10).map(p => this.item(p, cantidad));
+    },
+
+    // Mismo cálculo que productos._aplicar_ofertas (el servidor lo vuelve a hacer al agregar)
+    item(p, cantidad) {
+        const [id, nombre, unidad, precio, , ofertas] = p;
+        const ahora = new Date();
+        const pad = n => String(n).padStart(2, "0");
+        const ahoraTxt = `${ahora.getFullYear()}-${pad(ahora.getMonth() + 1)}-${pad(ahora.getDate())} ${pad(ahora.getHours())}:${pad(ahora.getMinutes())}:${pad(ahora.getSeconds())}`;
+
+        let precioFinal = precio;
+        let descripcion = null;
+        for (const [tipo, precioOferta, cantidadMinima, descuento, inicio, fin] of ofertas) {
+            if (inicio > ahoraTxt || fin < ahoraTxt) continue;
+            if (tipo === "individual_precio" && precioOferta) {
+                precioFinal = precioOferta;
+                descripcion = `Precio especial: $${precioOferta}`;
+                break;
+            } else if (tipo === "individual_cantidad" && cantidadMinima && cantidad >= cantidadMinima) {
+                precioFinal = precio - precio * (descuento / 100);
+                descripcion = `Descuento por cantidad: ${descuento}%`;
+                break;
+            } else if (tipo === "conjunto_descuento") {
+                precioFinal = precio - precio * ((descuento || 0) / 100);
+                descripcion = `Descuento conjunto: ${descuento || 0}%`;
+            }
+        }
+
+        return {
+            id, nombre, unidad,
+            precio: precioFinal,
+            precio_original: precio,
+            tiene_oferta: descripcion !== null,
+            descripcion_oferta: descripcion
+        };
+    }
+};
+
+function normalizar(texto) {
+    return texto.normalize("NFD").replace(/[\u0300-\u036f]/g, "").toLowerCase();
+}
+
 async function buscarProductos(q) {
+    if (catalogoLocal.listo()) {
+        return catalogoLocal.buscar(q);
+    }
     const res = await fetch(`/productos/autocomplete?q=${encodeURIComponent(q)}`);
     return await res.json();
 }
@@ -10,6 +120,13 @@ document.addEventListener("DOMContentLoaded", () => {
     const hiddenId = document.querySelector("#producto_id_hidden");
 
     if (input) {
+        // Traer el catálogo al abrir la pantalla y revalidarlo cada minuto o al volver a la ventana
+        catalogoLocal.cargarGuardado();
+        const sincronizar = () => catalogoLocal.sincronizar().catch(err => console.error("Error al sincronizar catálogo:", err));
+        sincronizar();
+        setInterval(sincronizar, 60000);
+        window.addEventListener("focus", sincronizar);
+
         input.addEventListener("input", async () => {
             const q = input.value.trim();
             if (!q) {
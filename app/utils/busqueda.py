@@ -0,0 +1,82 @@
+import re
+import unicodedata
+
+# -----------------------
+# Búsqueda de productos por nombre
+# -----------------------
+# Con FTS5 (tabla productos_fts, ver migración 2 de init_db) la búsqueda usa el índice:
+# prefijos, sin acentos y ordenada por relevancia (bm25).
+# Sin FTS5 se cae a un LIKE sobre el nombre sin acentos: mismas coincidencias, pero recorre la tabla.
+
+_fts_disponible = None
+
+
+def sin_acentos(texto):
+    if texto is None:
+        return None
+    if texto.isascii():
+        return texto.lower()
+    descompuesto = unicodedata.normalize("NFD", texto)
+    return "".join(c for c in descompuesto if unicodedata.category(c) != "Mn").lower()
+
+
+def _terminos(q):
+    return re.findall(r"\w+", sin_acentos(q or ""))
+
+
+def hay_fts(db):
+    global _fts_disponible
+    if _fts_disponible is None:
+        _fts_disponible = db.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'productos_fts'"
+        ).fetchone() is not None
+    return _fts_disponible
+
+
+def buscar_productos(db, q, limite=10, usar_fts=None):
+    """
+    Busca productos cuyo nombre tenga palabras que empiecen con los términos de `q`
+    ("tuberculo" encuentra "Tubérculos"). Retorna filas con id, nombre, precio y unidad.
+    """
+    terminos = _terminos(q)
+    if not terminos:
+        return []
+
+    if usar_fts is None:
+        usar_fts = hay_fts(db)
+
+    if usar_fts:
+        consulta = " ".join(f'"{t}"*' for t in terminos)
+        return db.execute("""
+            SELECT
+                p.id,
+                p.nombre,
+                p.precio,
+                u.nombre AS unidad
+            FROM (
+                SELECT rowid, rank
+                FROM productos_fts
+                WHERE productos_fts MATCH ?
+                ORDER BY rank
+                LIMIT ?
+            ) f
+            JOIN productos p ON p.id = f.rowid
+            LEFT JOIN unidades u ON p.unidad_id = u.id
+            ORDER BY f.rank
+        """, (consulta, limite)).fetchall()
+
+    # Respaldo sin FTS5: cada término tiene que ser el comienzo de alguna palabra
+    db.create_function("sin_acentos", 1, sin_acentos, deterministic=True)
+    condiciones = " AND ".join(["(' ' || sin_acentos(p.nombre)) LIKE ?"] * len(terminos))
+    return db.execute(f"""
+        SELECT
+            p.id,
+            p.nombre,
+            p.precio,
+            u.nombre AS unidad
+        FROM productos p
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        WHERE {condiciones}
+        ORDER BY sin_acentos(p.nombre) LIKE ? DESC, length(p.nombre)
+        LIMIT ?
+    """, [f"% {t}%" for t in terminos] + [f"{terminos[0]}%", limite]).fetchall()
@@ -0,0 +1,80 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, make_response
+from db import get_db
+
+# -----------------------
+# Cache de respuestas
+# -----------------------
+# Para endpoints de solo lectura que recalculan los mismos agregados (dashboard).
+# Cada entrada se guarda con la "generación" de los datos en la que se calculó:
+# - un contador local que suben las rutas que escriben (invalidar_cache), y
+# - catalogo_version, que los triggers suben en cada venta, ingreso de stock y cambio
+#   de ofertas o productos, así también se enteran los otros workers de gunicorn.
+# Si la generación cambió la entrada no sirve; si no, dura hasta CACHE_TTL segundos.
+# La misma generación arma el ETag: con If-None-Match igual se responde 304 sin calcular nada.
+
+CACHE_TTL = 30       # segundos
+CACHE_MAX = 128      # entradas por endpoint
+
+_lock = threading.Lock()
+_generacion_local = 0
+
+
+def invalidar_cache():
+    """Descarta todo lo cacheado en este proceso (llamar después de escribir)."""
+    global _generacion_local
+    with _lock:
+        _generacion_local += 1
+
+
+def generacion(db):
+    version = db.execute("SELECT version FROM catalogo_version WHERE id = 1").fetchone()
+    return f"{_generacion_local}.{version[0] if version else 0}"
+
+
+def cacheado(ttl=CACHE_TTL, max_entradas=CACHE_MAX):
+    """Decorador para vistas GET que devuelven JSON: cache TTL + LRU por endpoint y argumentos."""
+    def decorador(vista):
+        entradas = OrderedDict()  # clave -> (generacion, vence, cuerpo, mimetype)
+
+        @wraps(vista)
+        def envoltura(*args, **kwargs):
+            gen = generacion(get_db())
+            clave = (tuple(sorted(kwargs.items())), tuple(sorted(request.args.items(multi=True))))
+            etag = hashlib.sha1(repr((request.endpoint, clave, gen)).encode()).hexdigest()[:20]
+
+            if etag in request.if_none_match:
+                respuesta = make_response("", 304)
+            else:
+                with _lock:
+                    entrada = entradas.get(clave)
+                    if entrada and (entrada[0] != gen or entrada[1] < time.monotonic()):
+                        entrada = None
+                    if entrada:
+                        entradas.move_to_end(clave)
+
+                if entrada:
+                    respuesta = make_response(entrada[2])
+                    respuesta.mimetype = entrada[3]
+                else:
+                    respuesta = make_response(vista(*args, **kwargs))
+                    if respuesta.status_code != 200:
+                        return respuesta
+                    with _lock:
+                        entradas[clave] = (gen, time.monotonic() + ttl, respuesta.get_data(), respuesta.mimetype)
+                        entradas.move_to_end(clave)
+                        while len(entradas) > max_entradas:
+                            entradas.popitem(last=False)
+
+            respuesta.set_etag(etag)
+            # El navegador guarda la respuesta pero pregunta siempre (barato gracias al 304)
+            respuesta.headers["Cache-Control"] = "private, no-cache"
+            return respuesta
+
+        envoltura.limpiar_cache = entradas.clear
+        return envoltura
+    return decorador
@@ -0,0 +1,228 @@
+import threading
+from collections import OrderedDict
+from datetime import timedelta
+from app.utils.fechas import ahora, ahora_texto, FORMATO
+
+# -----------------------
+# Carritos del lado del servidor
+# -----------------------
+# Las líneas viven en carritos_pendientes/detalle_carritos y la sesión solo guarda el id.
+# Cada escritura va primero a la base y después al cache en memoria (write-through).
+# carritos_pendientes.version sube en cada escritura: si otro worker tocó el carrito,
+# el cache queda desactualizado y se vuelve a leer de la base. ultima_actividad se
+# actualiza en cada escritura y al retomar: por ella se borran los abandonados.
+
+CACHE_MAX = 256
+CARRITO_ABANDONADO_HORAS = 24  # un carrito activo sin usar por más que esto quedó de una sesión perdida
+
+_lock = threading.Lock()
+_cache = OrderedDict()  # carrito_id -> (version, lineas)
+
+
+def _guardar_en_cache(carrito_id, version, lineas):
+    with _lock:
+        _cache[carrito_id] = (version, lineas)
+        _cache.move_to_end(carrito_id)
+        while len(_cache) > CACHE_MAX:
+            _cache.popitem(last=False)
+
+
+def _olvidar(carrito_id):
+    with _lock:
+        _cache.pop(carrito_id, None)
+
+
+def _cargar_lineas(db, carrito_id):
+    filas = db.execute("""
+        SELECT
+            d.id AS detalle_id,
+            d.producto_id,
+            d.cantidad,
+            d.subtotal,
+            p.nombre,
+            p.precio,
+            p.stock - p.stock_defectuoso AS stock_disponible,
+            u.nombre AS unidad
+        FROM detalle_carritos d
+        JOIN productos p ON d.producto_id = p.id
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        WHERE d.carrito_id = ?
+        ORDER BY d.id
+    """, (carrito_id,)).fetchall()
+
+    # Los precios con oferta los recalcula ventas.recalcular_carrito
+    return [{
+        "detalle_id": f["detalle_id"],
+        "producto_id": f["producto_id"],
+        "nombre": f["nombre"],
+        "cantidad": f["cantidad"],
+        "precio": f["precio"],
+        "precio_original": f["precio"],
+        "subtotal": f["subtotal"],
+        "stock_disponible": f["stock_disponible"],
+        "unidad": f["unidad"] or "",
+        "tiene_oferta": False,
+        "descuento_aplicado": 0,
+        "descripcion_oferta": None
+    } for f in filas]
+
+
+def _tocar(db, carrito_id, lineas):
+    """Sube la versión y actualiza el total y la actividad del carrito; retorna la nueva versión."""
+    total = sum(i["subtotal"] for i in lineas)
+    db.execute("""
+        UPDATE carritos_pendientes
+        SET version = version + 1, total = ?, ultima_actividad = ?
+        WHERE id = ?
+    """, (total, ahora_texto(), carrito_id))
+    return db.execute("SELECT version FROM carritos_pendientes WHERE id = ?", (carrito_id,)).fetchone()["version"]
+
+
+def crear_carrito(db, usuario_id):
+    """Crea un carrito activo vacío y retorna su id (de paso borra los abandonados)."""
+    limpiar_abandonados(db)
+    fecha = ahora_texto()
+    cur = db.execute("""
+        INSERT INTO carritos_pendientes (usuario_id, nombre, total, fecha_creacion, ultima_actividad, estado, version)
+        VALUES (?, '', 0, ?, ?, 'activo', 0)
+    """, (usuario_id, fecha, fecha))
+    db.commit()
+    _guardar_en_cache(cur.lastrowid, 0, [])
+    return cur.lastrowid
+
+
+def obtener_carrito(db, carrito_id, estado="activo"):
+    """
+    Retorna las líneas del carrito (lista de dicts) o None si no existe.
+    Con el cache al día cuesta una sola lectura por clave primaria.
+    """
+    fila = db.execute(
+        "SELECT version, estado FROM carritos_pendientes WHERE id = ?", (carrito_id,)
+    ).fetchone()
+    if not fila or fila["estado"] != estado:
+        _olvidar(carrito_id)
+        return None
+
+    with _lock:
+        en_cache = _cache.get(carrito_id)
+    if en_cache and en_cache[0] == fila["version"]:
+        return en_cache[1]
+
+    lineas = _cargar_lineas(db, carrito_id)
+    _guardar_en_cache(carrito_id, fila["version"], lineas)
+    return lineas
+
+
+def agregar_linea(db, carrito_id, item):
+    """Agrega una línea al carrito; `item` tiene el mismo formato que las líneas de obtener_carrito."""
+    lineas = obtener_carrito(db, carrito_id) or []
+    cur = db.execute("""
+        INSERT INTO detalle_carritos (carrito_id, producto_id, cantidad, subtotal)
+        VALUES (?, ?, ?, ?)
+    """, (carrito_id, item["producto_id"], item["cantidad"], item["subtotal"]))
+
+    lineas = lineas + [dict(item, detalle_id=cur.lastrowid)]
+    version = _tocar(db, carrito_id, lineas)
+    db.commit()
+    _guardar_en_cache(carrito_id, version, lineas)
+    return lineas
+
+
+def quitar_linea(db, carrito_id, idx):
+    """Quita la línea en la posición `idx`; retorna False si no existe."""
+    lineas = obtener_carrito(db, carrito_id)
+    if not lineas or not 0 <= idx < len(lineas):
+        return False
+
+    db.execute("DELETE FROM detalle_carritos WHERE id = ?", (lineas[idx]["detalle_id"],))
+    lineas = lineas[:idx] + lineas[idx + 1:]
+    version = _tocar(db, carrito_id, lineas)
+    db.commit()
+    _guardar_en_cache(carrito_id, version, lineas)
+    return True
+
+
+def eliminar_carrito(db, carrito_id):
+    """Borra el carrito y sus líneas. No hace commit: se usa dentro de otras transacciones."""
+    db.execute("DELETE FROM detalle_carritos WHERE carrito_id = ?", (carrito_id,))
+    db.execute("DELETE FROM carritos_pendientes WHERE id = ?", (carrito_id,))
+    _olvidar(carrito_id)
+
+
+def _eliminar_donde(db, condicion, params):
+    ids = [f["id"] for f in db.execute(f"SELECT id FROM carritos_pendientes WHERE {condicion}", params)]
+    for carrito_id in ids:
+        eliminar_carrito(db, carrito_id)
+    return len(ids)
+
+
+def limpiar_abandonados(db, horas=CARRITO_ABANDONADO_HORAS):
+    """
+    Borra los carritos activos sin usar hace más de `horas` (sesiones vencidas que nunca
+    cerraron la venta): sus líneas impedirían borrar productos y usuarios. No hace commit.
+    """
+    limite = (ahora() - timedelta(hours=horas)).strftime(FORMATO)
+    return _eliminar_donde(db, "estado = 'activo' AND ultima_actividad < ?", (limite,))
+
+
+def eliminar_activos_del_usuario(db, usuario_id):
+    """Borra los carritos activos del usuario (los aparcados se conservan). No hace commit."""
+    return _eliminar_donde(db, "estado = 'activo' AND usuario_id = ?", (usuario_id,))
+
+
+# -----------------------
+# Carritos aparcados
+# -----------------------
+
+def aparcar_carrito(db, carrito_id, nombre):
+    """Deja el carrito en espera con un nombre. No hace commit."""
+    db.execute("""
+        UPDATE carritos_pendientes
+        SET estado = 'aparcado', nombre = ?, version = version + 1
+        WHERE id = ?
+    """, (nombre, carrito_id))
+    _olvidar(carrito_id)
+
+
+def listar_aparcados(db, usuario_id):
+    return db.execute("""
+        SELECT
+            c.id,
+            c.nombre,
+            c.total,
+            c.fecha_creacion,
+            COUNT(d.id) AS lineas
+        FROM carritos_pendientes c
+        LEFT JOIN detalle_carritos d ON d.carrito_id = c.id
+        WHERE c.usuario_id = ? AND c.estado = 'aparcado'
+        GROUP BY c.id
+        ORDER BY c.id DESC
+    """, (usuario_id,)).fetchall()
+
+
+def retomar_carrito(db, carrito_id, usuario_id):
+    """
+    Vuelve a activar un carrito aparcado del usuario.
+    Retorna sus líneas leídas de la base (con el stock actual) o None si no existe.
+    No hace commit.
+    """
+    cur = db.execute("""
+        UPDATE carritos_pendientes
+        SET estado = 'activo', version = version + 1, ultima_actividad = ?
+        WHERE id = ? AND usuario_id = ? AND estado = 'aparcado'
+    """, (ahora_texto(), carrito_id, usuario_id))
+    if cur.rowcount == 0:
+        return None
+
+    _olvidar(carrito_id)
+    return _cargar_lineas(db, carrito_id)
+
+
+def guardar_precios(db, carrito_id, lineas):
+    """Persiste los subtotales recalculados y el total del carrito. No hace commit."""
+    db.executemany(
+        "UPDATE detalle_carritos SET subtotal = ? WHERE id = ?",
+        [(i["subtotal"], i["detalle_id"]) for i in lineas]
+    )
+    _tocar(db, carrito_id, lineas)
+    _olvidar(carrito_id)
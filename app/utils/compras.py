@@ -0,0 +1,88 @@
+from app.utils.importacion import clave_nombre, leer_numero, NumeroAmbiguo
+
+# -----------------------
+# Ingreso de compras a proveedores
+# -----------------------
+# Un remito se procesa en tres pasos: validar todas las líneas (sin tocar la base más
+# que para leer los productos), sumar las cantidades por producto y escribir todo junto
+# dentro de la transacción del que llama: un executemany a ingresos_stock (los triggers
+# abren los lotes y actualizan el costo promedio) y un UPDATE ... FROM por lotes de
+# productos para el stock, en vez de un INSERT y un UPDATE por línea.
+
+LOTE_STOCK = 400  # productos por UPDATE (2 parámetros cada uno)
+
+
+def validar_lineas(db, filas):
+    """
+    `filas` son dicts con producto (id o nombre), cantidad y precio (opcional).
+    Retorna (lineas, errores): lineas como (producto_id, cantidad, precio_unitario)
+    y errores como textos "Línea N: ...". Las filas completamente vacías se ignoran.
+    """
+    ids, por_nombre = set(), {}
+    for p in db.execute("SELECT id, nombre FROM productos"):
+        ids.add(p["id"])
+        por_nombre[clave_nombre(p["nombre"])] = p["id"]
+
+    lineas, errores = [], []
+    for numero, fila in enumerate(filas, start=1):
+        producto = str(fila.get("producto_id") or fila.get("producto") or "").strip()
+        cantidad = fila.get("cantidad")
+        precio = fila.get("precio", fila.get("precio_unitario"))
+        if not producto and cantidad in (None, "") and precio in (None, ""):
+            continue
+
+        problemas = []
+        if producto.isdigit():
+            producto_id = int(producto) if int(producto) in ids else None
+        else:
+            producto_id = por_nombre.get(clave_nombre(producto))
+        if producto_id is None:
+            problemas.append(f"producto desconocido: {producto}" if producto else "falta el producto")
+
+        try:
+            cantidad = leer_numero(cantidad)
+            if cantidad is None or cantidad <= 0:
+                problemas.append("la cantidad debe ser mayor a 0")
+        except NumeroAmbiguo:
+            problemas.append(f"cantidad ambigua: {cantidad} (escribí 1250 o 1,25)")
+        except ValueError:
+            problemas.append(f"cantidad inválida: {cantidad}")
+
+        try:
+            precio = leer_numero(precio)
+            if precio is not None and precio < 0:
+                problemas.append("precio negativo")
+        except NumeroAmbiguo:
+            problemas.append(f"precio ambiguo: {precio} (escribí 1234 o 1.234,00)")
+        except ValueError:
+            problemas.append(f"precio inválido: {precio}")
+
+        if problemas:
+            errores.append(f"Línea {numero}: {', '.join(problemas)}")
+        else:
+            lineas.append((producto_id, cantidad, precio))
+
+    return lineas, errores
+
+
+def registrar_compra(db, proveedor_id, lineas, fecha):
+    """Escribe los ingresos y suma el stock. No hace commit: va dentro de una transacción."""
+    db.executemany("""
+        INSERT INTO ingresos_stock (producto_id, proveedor_id, cantidad, fecha, precio_unitario)
+        VALUES (?, ?, ?, ?, ?)
+    """, [(producto_id, proveedor_id, cantidad, fecha, precio) for producto_id, cantidad, precio in lineas])
+
+    deltas = {}
+    for producto_id, cantidad, _ in lineas:
+        deltas[producto_id] = deltas.get(producto_id, 0) + cantidad
+
+    items = list(deltas.items())
+    for i in range(0, len(items), LOTE_STOCK):
+        lote = items[i:i + LOTE_STOCK]
+        valores = ",".join(["(?, ?)"] * len(lote))
+        db.execute(f"""
+            UPDATE productos
+            SET stock = stock + d.column2
+            FROM (VALUES {valores}) AS d
+            WHERE productos.id = d.column1
+        """, [v for item in lote for v in item])
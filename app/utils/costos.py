@@ -0,0 +1,69 @@
+# -----------------------
+# Costo de la mercadería vendida
+# -----------------------
+# Cada ingreso de stock abre un lote en lotes_inventario (trigger de la migración 8).
+# Al vender se consumen los lotes del producto del más viejo al más nuevo (FIFO) y el
+# costo de cada línea queda guardado en detalle_ventas.costo: los reportes de margen
+# solo suman. Si no quedan lotes (stock cargado sin ingresos) se usa el costo promedio
+# ponderado de costos_productos.
+
+CONFIG_COSTOS = {
+    "COSTO_METODO": "fifo",  # "fifo" o "promedio" (costo promedio ponderado)
+}
+
+
+def _costo_promedio(db, producto_id):
+    fila = db.execute(
+        "SELECT costo_promedio FROM costos_productos WHERE producto_id = ?", (producto_id,)
+    ).fetchone()
+    return fila["costo_promedio"] if fila else 0
+
+
+def consumir_lotes(db, producto_id, cantidad):
+    """
+    Descuenta `cantidad` de los lotes abiertos del producto, del más viejo al más nuevo.
+    Retorna el costo FIFO de esa cantidad. Recorre solo los lotes que toca. No hace commit.
+    """
+    costo = 0
+    restante = cantidad
+    actualizados = []
+
+    lotes = db.execute("""
+        SELECT id, cantidad_restante, costo_unitario
+        FROM lotes_inventario
+        WHERE producto_id = ? AND cantidad_restante > 0
+        ORDER BY id
+    """, (producto_id,))
+    for lote in lotes:
+        if restante <= 0:
+            break
+        usado = min(restante, lote["cantidad_restante"])
+        costo += usado * lote["costo_unitario"]
+        restante -= usado
+        actualizados.append((usado, lote["id"]))
+
+    db.executemany(
+        "UPDATE lotes_inventario SET cantidad_restante = cantidad_restante - ? WHERE id = ?",
+        actualizados
+    )
+
+    # Lo que no alcanzaron a cubrir los lotes, a costo promedio
+    if restante > 0:
+        costo += restante * _costo_promedio(db, producto_id)
+    return costo
+
+
+def costear_lineas(db, lineas, metodo="fifo"):
+    """
+    Consume los lotes de cada línea (producto_id, cantidad) y retorna el costo de cada una
+    según `metodo`. Los lotes se consumen siempre, así el inventario queda al día aunque
+    se reporte a costo promedio. No hace commit: va dentro de la transacción de la venta.
+    """
+    costos = []
+    for producto_id, cantidad in lineas:
+        costo_fifo = consumir_lotes(db, producto_id, cantidad)
+        if metodo == "promedio":
+            costos.append(cantidad * _costo_promedio(db, producto_id))
+        else:
+            costos.append(costo_fifo)
+    return costos
@@ -0,0 +1,74 @@
+import json
+import queue
+import threading
+
+# -----------------------
+# Eventos en vivo (Server-Sent Events)
+# -----------------------
+# Pub/sub dentro del proceso: cada dashboard conectado a /reportes/stream tiene su cola
+# y las rutas que escriben publican en todas. Solo usa threading y queue, así que anda
+# con el worker sync/gthread de gunicorn (un hilo por conexión abierta: configurar
+# --threads según los dashboards esperados) y con gevent, que parchea ambos módulos.
+# Es local al proceso: con varios workers cada dashboard ve las ventas de su worker;
+# cuando reconecta (o recibe "recargar") vuelve a pedir todo a /reportes/data.
+
+CONFIG_EVENTOS = {
+    "EVENTOS_HEARTBEAT": 15,   # segundos entre comentarios "ping" (mantiene viva la conexión)
+    "EVENTOS_COLA_MAX": 100,   # eventos pendientes por cliente antes de darlo por lento
+}
+
+_lock = threading.Lock()
+_suscriptores = set()
+
+
+def hay_suscriptores():
+    return bool(_suscriptores)
+
+
+def suscribir(maximo=CONFIG_EVENTOS["EVENTOS_COLA_MAX"]):
+    cola = queue.Queue(maxsize=maximo)
+    with _lock:
+        _suscriptores.add(cola)
+    return cola
+
+
+def desuscribir(cola):
+    with _lock:
+        _suscriptores.discard(cola)
+
+
+def publicar(tipo, datos):
+    """Envía el evento a todos los suscriptores sin bloquear a quien publica."""
+    with _lock:
+        colas = list(_suscriptores)
+    for cola in colas:
+        try:
+            cola.put_nowait((tipo, datos))
+        except queue.Full:
+            # Cliente que no lee: se descarta lo pendiente y se le pide recargar todo
+            with cola.mutex:
+                cola.queue.clear()
+            cola.put_nowait(("recargar", {}))
+
+
+def formatear(tipo, datos):
+    return f"event: {tipo}\ndata: {json.dumps(datos)}\n\n"
+
+
+def flujo(heartbeat=CONFIG_EVENTOS["EVENTOS_HEARTBEAT"], maximo=CONFIG_EVENTOS["EVENTOS_COLA_MAX"]):
+    """
+    Generador del cuerpo de la respuesta SSE. El heartbeat además sirve para detectar
+    clientes desconectados: la escritura falla y el servidor cierra el generador.
+    """
+    cola = suscribir(maximo)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                tipo, datos = cola.get(timeout=heartbeat)
+            except queue.Empty:
+                yield ": ping\n\n"
+                continue
+            yield formatear(tipo, datos)
+    finally:
+        desuscribir(cola)
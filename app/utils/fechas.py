@@ -0,0 +1,58 @@
+import datetime
+
+# -----------------------
+# Fechas
+# -----------------------
+# Todas las fechas se guardan como texto "YYYY-MM-DD HH:MM:SS" en hora local del negocio.
+# Ese formato ordena igual como texto que como fecha, así las columnas de fecha se
+# comparan directo contra rangos y usan sus índices (nada de date(substr(...))).
+# Hora local y no UTC: los reportes agrupan por día con substr(fecha, 1, 10).
+
+FORMATO = "%Y-%m-%d %H:%M:%S"
+
+# El servidor está en USA West (UTC-7) y el negocio en Argentina (UTC-3)
+AJUSTE_HORAS = -4
+
+
+def ahora():
+    """Hora actual del negocio (datetime)."""
+    return datetime.datetime.now() + datetime.timedelta(hours=AJUSTE_HORAS)
+
+
+def ahora_texto():
+    """Hora actual del negocio en el formato de la base."""
+    return ahora().strftime(FORMATO)
+
+
+def normalizar(texto):
+    """
+    Lleva una fecha de formulario o de datos viejos ("YYYY-MM-DD", "YYYY-MM-DDTHH:MM",
+    "YYYY-MM-DD HH:MM", con o sin segundos) al formato de la base. None si no se entiende.
+    """
+    if not texto:
+        return None
+    texto = texto.strip().replace("T", " ")
+    for formato in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(texto, formato).strftime(FORMATO)
+        except ValueError:
+            continue
+    return None
+
+
+def inicio_del_dia(texto):
+    """'YYYY-MM-DD' -> 'YYYY-MM-DD 00:00:00' (límite inferior inclusivo de un rango)."""
+    try:
+        dia = datetime.datetime.strptime(texto.strip()[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+    return dia.strftime(FORMATO)
+
+
+def inicio_del_dia_siguiente(texto):
+    """'YYYY-MM-DD' -> inicio del día siguiente (límite superior exclusivo de un rango)."""
+    try:
+        dia = datetime.datetime.strptime(texto.strip()[:10], "%Y-%m-%d")
+    except ValueError:
+        return None
+    return (dia + datetime.timedelta(days=1)).strftime(FORMATO)
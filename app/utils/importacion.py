@@ -0,0 +1,175 @@
+import csv
+import io
+import json
+import re
+
+# -----------------------
+# Importación masiva de productos y precios
+# -----------------------
+# El archivo (CSV o JSON) se valida entero contra un diccionario de productos armado
+# con una sola consulta; si alguna fila tiene errores no se aplica nada. Si está bien,
+# las altas y los cambios van en una transacción con dos executemany.
+# Se buscan por nombre sin distinguir mayúsculas ni espacios de más. El stock solo
+# se usa al crear: los ingresos de stock se cargan por proveedores (lotes y costos).
+
+COLUMNAS = ["nombre", "precio", "categoria", "unidad", "stock"]
+
+# "1.234" o "12.345.678": puntos seguidos de exactamente tres dígitos y sin coma
+_MILES = re.compile(r"-?\d{1,3}(\.\d{3})+")
+
+
+class NumeroAmbiguo(ValueError):
+    """Un número como "1.234" sin "$" ni coma: puede ser 1234 o 1,234."""
+
+
+def clave_nombre(nombre):
+    return " ".join(str(nombre).split()).casefold()
+
+
+def leer_numero(valor):
+    """
+    Acepta 1234.5, "1234,5", "$ 1.234,50" o "$1.234"; None si está vacío.
+    Con "$" el punto seguido de tres dígitos es separador de miles. Sin "$" ni coma,
+    "1.234" (¿mil doscientos o uno con dos?) se rechaza con NumeroAmbiguo en vez de adivinar.
+    """
+    if valor is None or isinstance(valor, (int, float)):
+        return valor
+    texto = str(valor).replace(" ", "").strip()
+    moneda = "$" in texto
+    texto = texto.replace("$", "")
+    if not texto:
+        return None
+    if "," in texto:
+        texto = texto.replace(".", "").replace(",", ".")
+    elif _MILES.fullmatch(texto):
+        if not moneda:
+            raise NumeroAmbiguo(valor)
+        texto = texto.replace(".", "")
+    return float(texto)
+
+
+def leer_filas(contenido, formato):
+    """Convierte el archivo en una lista de dicts con las claves de COLUMNAS."""
+    if formato == "json":
+        datos = json.loads(contenido)
+        if isinstance(datos, dict):
+            datos = datos.get("productos", [])
+        if not isinstance(datos, list) or not all(isinstance(d, dict) for d in datos):
+            raise ValueError("El JSON debe ser una lista de productos")
+        filas = datos
+    else:
+        texto = contenido.decode("utf-8-sig") if isinstance(contenido, bytes) else contenido
+        # Las planillas en castellano suelen exportar con ";"
+        separador = ";" if texto.split("\n", 1)[0].count(";") > texto.split("\n", 1)[0].count(",") else ","
+        filas = list(csv.DictReader(io.StringIO(texto), delimiter=separador))
+
+    return [{k.strip().lower(): v for k, v in f.items() if k} for f in filas]
+
+
+def planificar_importacion(db, filas):
+    """
+    Valida todas las filas y calcula qué hacer con cada una sin escribir nada.
+    Retorna (altas, cambios, reporte): altas y cambios listos para executemany y un
+    reporte por fila con estado "nuevo", "actualizado", "sin cambios" o "error".
+    """
+    productos = {}
+    repetidos = set()
+    for p in db.execute("SELECT id, nombre, precio, categoria_id, unidad_id FROM productos"):
+        clave = clave_nombre(p["nombre"])
+        if clave in productos:
+            repetidos.add(clave)
+        productos[clave] = p
+    nombres_categorias = {c["id"]: c["nombre"] for c in db.execute("SELECT id, nombre FROM categorias")}
+    nombres_unidades = {u["id"]: u["nombre"] for u in db.execute("SELECT id, nombre FROM unidades")}
+    categorias = {clave_nombre(nombre): id for id, nombre in nombres_categorias.items()}
+    unidades = {clave_nombre(nombre): id for id, nombre in nombres_unidades.items()}
+
+    altas, cambios, reporte = [], [], []
+    vistos = set()
+
+    for numero, fila in enumerate(filas, start=1):
+        nombre = " ".join(str(fila.get("nombre") or "").split())
+        clave = clave_nombre(nombre)
+        item = {"fila": numero, "nombre": nombre}
+        reporte.append(item)
+
+        errores = []
+        if not nombre:
+            errores.append("falta el nombre")
+        elif clave in vistos:
+            errores.append("el producto está repetido en el archivo")
+        elif clave in repetidos:
+            errores.append("hay más de un producto con ese nombre")
+        vistos.add(clave)
+
+        valores = {}
+        for campo in ("precio", "stock"):
+            try:
+                valores[campo] = leer_numero(fila.get(campo))
+            except NumeroAmbiguo:
+                errores.append(f"{campo} ambiguo: {fila.get(campo)} (escribí 1234 o 1.234,00)")
+                continue
+            except ValueError:
+                errores.append(f"{campo} inválido: {fila.get(campo)}")
+                continue
+            if valores[campo] is not None and valores[campo] < 0:
+                errores.append(f"{campo} negativo")
+
+        for campo, tabla in (("categoria", categorias), ("unidad", unidades)):
+            texto = fila.get(campo)
+            valores[campo] = None
+            if texto not in (None, ""):
+                valores[campo] = tabla.get(clave_nombre(texto))
+                if valores[campo] is None:
+                    errores.append(f"{campo} desconocida: {texto}")
+
+        actual = productos.get(clave)
+        if not actual and valores.get("precio") is None and not errores:
+            errores.append("falta el precio (producto nuevo)")
+
+        if errores:
+            item.update(estado="error", errores=errores)
+            continue
+
+        if not actual:
+            altas.append((nombre, valores["precio"], valores["stock"] or 0, valores["categoria"], valores["unidad"]))
+            item["estado"] = "nuevo"
+            continue
+
+        # Solo lo que vino en el archivo; lo que falta queda como está
+        nuevo = {
+            "precio": actual["precio"] if valores["precio"] is None else valores["precio"],
+            "categoria_id": valores["categoria"] or actual["categoria_id"],
+            "unidad_id": valores["unidad"] or actual["unidad_id"],
+        }
+        diferencias = {}
+        if nuevo["precio"] != actual["precio"]:
+            diferencias["precio"] = [actual["precio"], nuevo["precio"]]
+        if nuevo["categoria_id"] != actual["categoria_id"]:
+            diferencias["categoria"] = [nombres_categorias.get(actual["categoria_id"]),
+                                        nombres_categorias.get(nuevo["categoria_id"])]
+        if nuevo["unidad_id"] != actual["unidad_id"]:
+            diferencias["unidad"] = [nombres_unidades.get(actual["unidad_id"]),
+                                     nombres_unidades.get(nuevo["unidad_id"])]
+
+        item["id"] = actual["id"]
+        if diferencias:
+            cambios.append((nuevo["precio"], nuevo["categoria_id"], nuevo["unidad_id"], actual["id"]))
+            item.update(estado="actualizado", cambios=diferencias)
+        else:
+            item["estado"] = "sin cambios"
+
+    return altas, cambios, reporte
+
+
+def aplicar_importacion(db, altas, cambios):
+    """Escribe altas y cambios. No hace commit: va dentro de una transacción."""
+    db.executemany("""
+        INSERT INTO productos (nombre, precio, stock, categoria_id, unidad_id)
+        VALUES (?, ?, ?, ?, ?)
+    """, altas)
+    db.executemany("""
+        UPDATE productos
+        SET precio = ?, categoria_id = ?, unidad_id = ?
+        WHERE id = ?
+    """, cambios)
@@ -0,0 +1,87 @@
+import threading
+import time
+from app.utils.fechas import ahora_texto
+
+# -----------------------
+# Índice en memoria de ofertas activas
+# -----------------------
+# producto_id -> lista de ofertas (ordenadas por prioridad) con su ventana de vigencia.
+# Se reconstruye perezosamente cuando alguien lo invalida (blueprint de ofertas)
+# o cuando vence el TTL, para que los otros workers de gunicorn también se enteren.
+# También recuerda el próximo vencimiento (menor fecha_fin), así la desactivación de
+# ofertas vencidas solo escribe en la base cuando ese momento efectivamente pasó.
+
+INDICE_TTL = 60  # segundos
+
+_lock = threading.Lock()
+_indice = None
+_construido_en = 0.0
+_proxima_expiracion = None  # menor fecha_fin entre las ofertas activas
+
+
+def _construir_indice(db):
+    filas = db.execute("""
+        SELECT
+            o.id AS oferta_id,
+            o.tipo_oferta,
+            o.fecha_inicio,
+            o.fecha_fin,
+            o.descuento_global,
+            op.producto_id,
+            op.precio_oferta,
+            op.cantidad_minima,
+            op.descuento_porcentaje
+        FROM ofertas o
+        JOIN oferta_productos op ON o.id = op.oferta_id
+        WHERE o.activo = 1
+        ORDER BY o.fecha_inicio DESC, o.id DESC
+    """).fetchall()
+
+    indice = {}
+    for f in filas:
+        indice.setdefault(f["producto_id"], []).append(dict(f))
+
+    # Próximo vencimiento: incluye ofertas activas sin productos asociados
+    proxima = db.execute("SELECT MIN(fecha_fin) FROM ofertas WHERE activo = 1").fetchone()[0]
+    return indice, proxima
+
+
+def obtener_indice(db):
+    """Devuelve el índice producto_id -> ofertas activas, construyéndolo si hace falta."""
+    global _indice, _construido_en, _proxima_expiracion
+    indice = _indice
+    if indice is not None and time.monotonic() - _construido_en < INDICE_TTL:
+        return indice
+
+    with _lock:
+        if _indice is None or time.monotonic() - _construido_en >= INDICE_TTL:
+            _indice, _proxima_expiracion = _construir_indice(db)
+            _construido_en = time.monotonic()
+        return _indice
+
+
+def invalidar_indice_ofertas():
+    """Descarta el índice; la próxima consulta de precios lo vuelve a armar."""
+    global _indice
+    with _lock:
+        _indice = None
+
+
+def hay_ofertas_vencidas(db, ahora):
+    """
+    True si alguna oferta activa ya pasó su fecha_fin.
+    Solo compara contra el próximo vencimiento conocido, sin tocar la base.
+    """
+    obtener_indice(db)
+    proxima = _proxima_expiracion
+    return proxima is not None and proxima < ahora
+
+
+def ofertas_vigentes(db, producto_id, ahora=None):
+    """Ofertas del producto cuya ventana [fecha_inicio, fecha_fin] incluye `ahora`."""
+    if ahora is None:
+        ahora = ahora_texto()
+    return [
+        o for o in obtener_indice(db).get(producto_id, ())
+        if o["fecha_inicio"] <= ahora <= o["fecha_fin"]
+    ]
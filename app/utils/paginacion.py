@@ -0,0 +1,39 @@
+import base64
+import json
+
+# -----------------------
+# Paginación por cursor (keyset)
+# -----------------------
+# En vez de OFFSET, cada página pide "las filas anteriores a (fecha, id) de la última
+# fila vista". Con un índice que cubra el orden, ir a la página 500 cuesta lo mismo
+# que ir a la primera. El cursor viaja en la URL como texto opaco.
+
+
+def codificar_cursor(fila):
+    """Cursor que apunta a las filas siguientes a `fila` (orden fecha DESC, id DESC)."""
+    datos = json.dumps([fila["fecha"], fila["id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(texto):
+    """Retorna (fecha, id) o None si el cursor falta o es inválido."""
+    if not texto:
+        return None
+    try:
+        relleno = "=" * (-len(texto) % 4)
+        fecha, id_ = json.loads(base64.urlsafe_b64decode(texto + relleno))
+        return str(fecha), int(id_)
+    except (ValueError, TypeError):
+        return None
+
+
+def paginar(filas, tamanio):
+    """
+    Recibe hasta tamanio + 1 filas (la consulta pide una de más para saber si hay
+    otra página) y retorna (filas de la página, cursor siguiente o None).
+    """
+    filas = list(filas)
+    if len(filas) > tamanio:
+        filas = filas[:tamanio]
+        return filas, codificar_cursor(filas[-1])
+    return filas, None
@@ -0,0 +1,125 @@
+import threading
+import time
+from collections import deque
+from flask import g, request, current_app
+
+# -----------------------
+# Perfil de SQL por request
+# -----------------------
+# Con SQLITE_PERFIL activado las conexiones de db.conectar miden cada consulta (ver
+# ConexionPerfilada en db.py) y este módulo las junta por request:
+# - header Server-Timing con el tiempo de SQL, la cantidad de consultas y el total
+#   (se ve en la pestaña Network del navegador),
+# - una ventana de los últimos requests por endpoint, en /admin/metrics,
+# - un warning en el log si un request pasa PERFIL_MAX_CONSULTAS (típico N+1).
+# Lo que se consulta mientras se transmite una respuesta en streaming (CSV, SSE)
+# ya no entra en el request.
+
+CONFIG_PERFIL = {
+    "PERFIL_MAX_CONSULTAS": 50,   # más consultas que esto en un request -> warning
+    "PERFIL_LENTAS": 5,           # consultas más lentas que se guardan por request y por endpoint
+    "PERFIL_VENTANA": 500,        # requests recientes por endpoint para los percentiles
+}
+
+# Límites de los buckets del histograma, en milisegundos
+BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000]
+
+_lock = threading.Lock()
+_endpoints = {}  # endpoint -> {"requests": deque, "lentas": [(ms, sql)], "total": n}
+
+
+class PerfilRequest:
+    def __init__(self, lentas):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.maximo_lentas = lentas
+        self.lentas = []  # (segundos, sql), de la más lenta a la más rápida
+
+    def registrar(self, sql, segundos):
+        self.consultas += 1
+        self.tiempo += segundos
+        if len(self.lentas) < self.maximo_lentas or segundos > self.lentas[-1][0]:
+            self.lentas.append((segundos, " ".join(sql.split())))
+            self.lentas.sort(reverse=True)
+            del self.lentas[self.maximo_lentas:]
+
+
+def _antes():
+    g.perfil_sql = PerfilRequest(current_app.config["PERFIL_LENTAS"])
+
+
+def _despues(respuesta):
+    perfil = g.pop("perfil_sql", None)
+    if perfil is None:
+        return respuesta
+
+    total_ms = (time.perf_counter() - perfil.inicio) * 1000
+    sql_ms = perfil.tiempo * 1000
+    respuesta.headers["Server-Timing"] = (
+        f'sql;dur={sql_ms:.2f};desc="{perfil.consultas} consultas", app;dur={total_ms:.2f}'
+    )
+
+    endpoint = request.endpoint or "sin_endpoint"
+    config = current_app.config
+    with _lock:
+        datos = _endpoints.setdefault(endpoint, {
+            "requests": deque(maxlen=config["PERFIL_VENTANA"]), "lentas": [], "total": 0,
+        })
+        datos["total"] += 1
+        datos["requests"].append((total_ms, sql_ms, perfil.consultas))
+        datos["lentas"] = sorted(
+            datos["lentas"] + [(s * 1000, sql) for s, sql in perfil.lentas], reverse=True
+        )[:config["PERFIL_LENTAS"]]
+
+    if perfil.consultas > config["PERFIL_MAX_CONSULTAS"]:
+        lenta = perfil.lentas[0][1][:200] if perfil.lentas else ""
+        current_app.logger.warning(
+            "%s %s: %d consultas SQL (%.1fms de %.1fms). La más lenta: %s",
+            request.method, request.full_path.rstrip("?"), perfil.consultas, sql_ms, total_ms, lenta
+        )
+    return respuesta
+
+
+def instalar(app):
+    """Registra la medición por request si SQLITE_PERFIL está activado."""
+    if app.config.get("SQLITE_PERFIL"):
+        app.before_request(_antes)
+        app.after_request(_despues)
+
+
+def _percentiles(valores):
+    valores = sorted(valores)
+    percentil = lambda p: valores[max(0, -(-len(valores) * p // 100) - 1)]
+    return {"p50": round(percentil(50), 2), "p95": round(percentil(95), 2), "p99": round(percentil(99), 2)}
+
+
+def metricas():
+    """Resumen por endpoint de la ventana de requests recientes."""
+    with _lock:
+        copia = {e: (list(d["requests"]), list(d["lentas"]), d["total"]) for e, d in _endpoints.items()}
+
+    resultado = {}
+    for endpoint, (requests, lentas, total) in sorted(copia.items()):
+        duraciones = [r[0] for r in requests]
+        # Cada bucket cuenta los requests por debajo de hasta_ms (None = el resto)
+        histograma = [{"hasta_ms": limite, "requests": 0} for limite in BUCKETS_MS + [None]]
+        for ms in duraciones:
+            posicion = next((i for i, limite in enumerate(BUCKETS_MS) if ms < limite), len(BUCKETS_MS))
+            histograma[posicion]["requests"] += 1
+
+        resultado[endpoint] = {
+            "requests": total,
+            "ventana": len(requests),
+            "duracion_ms": _percentiles(duraciones),
+            "sql_ms": _percentiles([r[1] for r in requests]),
+            "consultas": _percentiles([r[2] for r in requests]),
+            "histograma_ms": histograma,
+            "consultas_lentas": [{"ms": round(ms, 2), "sql": sql[:300]} for ms, sql in lentas],
+        }
+    return resultado
+
+
+def reiniciar_metricas():
+    with _lock:
+        _endpoints.clear()
@@ -0,0 +1,71 @@
+# -----------------------
+# Resúmenes diarios de ventas
+# -----------------------
+# Totales por día, por día y producto y por día y método de pago. Se actualizan dentro
+# de la misma transacción que registra la venta, así el dashboard lee unas pocas filas
+# por día en vez de agrupar todo el historial. init_db.py --resumenes los reconstruye.
+
+
+def registrar_venta(db, fecha, total, lineas, pagos):
+    """
+    Suma la venta a los resúmenes. `lineas` son (producto_id, cantidad, subtotal, costo) y
+    `pagos` son (metodo_id, monto). No hace commit: va dentro de la transacción de la venta.
+    """
+    dia = fecha[:10]
+
+    db.execute("""
+        INSERT INTO resumen_ventas_diarias (dia, ventas, total)
+        VALUES (?, 1, ?)
+        ON CONFLICT(dia) DO UPDATE SET
+            ventas = ventas + 1,
+            total = total + excluded.total
+    """, (dia, total))
+
+    db.executemany("""
+        INSERT INTO resumen_ventas_productos (dia, producto_id, cantidad, monto, costo)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(dia, producto_id) DO UPDATE SET
+            cantidad = cantidad + excluded.cantidad,
+            monto = monto + excluded.monto,
+            costo = costo + excluded.costo
+    """, [(dia, producto_id, cantidad, subtotal, costo) for producto_id, cantidad, subtotal, costo in lineas])
+
+    db.executemany("""
+        INSERT INTO resumen_ventas_pagos (dia, metodo_id, monto)
+        VALUES (?, ?, ?)
+        ON CONFLICT(dia, metodo_id) DO UPDATE SET
+            monto = monto + excluded.monto
+    """, [(dia, metodo_id, monto) for metodo_id, monto in pagos])
+
+
+def cambios_del_dia(db, dia, producto_ids):
+    """
+    Lo que cambió en el dashboard después de una venta: totales del día y cantidad
+    acumulada de los productos vendidos (el navegador los reordena en su top).
+    """
+    fila = db.execute("""
+        SELECT d.total, COALESCE((
+            SELECT SUM(costo) FROM resumen_ventas_productos WHERE dia = d.dia
+        ), 0) AS costo
+        FROM resumen_ventas_diarias d
+        WHERE d.dia = ?
+    """, (dia,)).fetchone()
+
+    marcas = ",".join("?" * len(producto_ids))
+    productos = db.execute(f"""
+        SELECT p.nombre, SUM(r.cantidad) AS cantidad
+        FROM resumen_ventas_productos r
+        JOIN productos p ON r.producto_id = p.id
+        WHERE r.producto_id IN ({marcas})
+        GROUP BY r.producto_id
+    """, list(producto_ids)).fetchall()
+
+    total = float(fila["total"] or 0) if fila else 0
+    costo = float(fila["costo"] or 0) if fila else 0
+    return {
+        "dia": dia,
+        "total": total,
+        "costo": costo,
+        "ganancia": total - costo,
+        "productos": [{"nombre": p["nombre"], "cantidad": p["cantidad"]} for p in productos],
+    }
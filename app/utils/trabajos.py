@@ -0,0 +1,194 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import sqlite3
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from db import transaccion
+from app.utils import fechas
+
+# -----------------------
+# Trabajos en segundo plano
+# -----------------------
+# Los reportes pesados se generan en un pool de procesos, fuera del worker de gunicorn
+# que atendió el pedido. El estado vive en la tabla `trabajos` (no en memoria), así
+# cualquier worker puede responder el polling y servir el archivo terminado.
+# La clave de un trabajo es un hash del tipo, los filtros normalizados y el estado de
+# los datos: pedir dos veces el mismo reporte sin ventas nuevas reutiliza el archivo.
+
+CONFIG_TRABAJOS = {
+    "TRABAJOS_DIR": None,             # None = carpeta "trabajos" junto a la base
+    "TRABAJOS_PROCESOS": 2,
+    "TRABAJOS_TIMEOUT": 15 * 60,      # s; un trabajo "en_proceso" más viejo se da por perdido
+    "TRABAJOS_RETENCION": 24 * 3600,  # s; después se borran el registro y el archivo
+}
+
+TIPOS = {
+    "ventas_pdf": ("pdf", "application/pdf"),
+    "ventas_csv": ("csv", "text/csv"),
+    "ganancias_netas": ("json", "application/json"),
+}
+
+_lock = threading.Lock()
+_pool = None
+
+
+def _obtener_pool(procesos):
+    global _pool
+    with _lock:
+        if _pool is None:
+            # spawn: el proceso hijo no hereda conexiones SQLite ni locks del padre
+            _pool = ProcessPoolExecutor(max_workers=procesos, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def normalizar_args(args, excluir=("tipo",)):
+    """Filtros como lista ordenada de pares (clave, valor), sin valores vacíos."""
+    return sorted(
+        (clave, valor)
+        for clave in args.keys()
+        if clave not in excluir
+        for valor in args.getlist(clave)
+        if valor not in ("", None)
+    )
+
+
+def _estado_datos(db):
+    """Lo que cambia cuando hay ventas, compras o cambios de catálogo nuevos."""
+    fila = db.execute("""
+        SELECT
+            (SELECT COALESCE(MAX(id), 0) FROM ventas),
+            (SELECT COALESCE(MAX(id), 0) FROM ingresos_stock),
+            (SELECT version FROM catalogo_version WHERE id = 1)
+    """).fetchone()
+    return list(fila)
+
+
+def clave_trabajo(db, tipo, parametros):
+    datos = json.dumps([tipo, parametros, _estado_datos(db)], separators=(",", ":"))
+    return hashlib.sha256(datos.encode()).hexdigest()
+
+
+def _opciones():
+    """Configuración de SQLite y de trabajos de la app actual (se le pasa al proceso hijo)."""
+    from flask import current_app
+    from db import _config
+
+    opciones = _config()
+    opciones.update({clave: current_app.config.get(clave, valor) for clave, valor in CONFIG_TRABAJOS.items()})
+    return opciones
+
+
+def _hace(segundos):
+    """Fecha en el formato de la base de hace `segundos` (hora del negocio)."""
+    return (fechas.ahora() - timedelta(seconds=segundos)).strftime(fechas.FORMATO)
+
+
+def _limpiar_viejos(db, retencion):
+    """Borra los registros vencidos y retorna sus archivos (se borran después del commit)."""
+    viejos = db.execute("SELECT id, archivo FROM trabajos WHERE creado_en < ?", (_hace(retencion),)).fetchall()
+    db.executemany("DELETE FROM trabajos WHERE id = ?", [(t["id"],) for t in viejos])
+    return [t["archivo"] for t in viejos]
+
+
+def encolar_trabajo(db, tipo, args):
+    """
+    Registra el trabajo y lo manda al pool, salvo que ya exista uno igual vigente.
+    Retorna la fila del trabajo.
+    """
+    opciones = _opciones()
+    parametros = normalizar_args(args)
+
+    extension, _ = TIPOS[tipo]
+    directorio = opciones["TRABAJOS_DIR"] or os.path.join(os.path.dirname(os.path.abspath(opciones["DATABASE"])), "trabajos")
+    os.makedirs(directorio, exist_ok=True)
+
+    # Limpieza, búsqueda del trabajo igual e INSERT con el lock de escritura tomado desde
+    # el principio: dos pedidos simultáneos se esperan (busy_timeout) en vez de fallar
+    # al querer pasar de lectura a escritura.
+    existente = None
+    try:
+        with transaccion(db):
+            borrar = _limpiar_viejos(db, opciones["TRABAJOS_RETENCION"])
+            clave = clave_trabajo(db, tipo, parametros)
+
+            existente = db.execute("SELECT * FROM trabajos WHERE clave = ?", (clave,)).fetchone()
+            if existente:
+                perdido = (
+                    existente["estado"] in ("pendiente", "en_proceso")
+                    and existente["creado_en"] < _hace(opciones["TRABAJOS_TIMEOUT"])
+                )
+                archivo_ok = existente["estado"] != "listo" or os.path.exists(existente["archivo"])
+                if existente["estado"] == "error" or perdido or not archivo_ok:
+                    db.execute("DELETE FROM trabajos WHERE id = ?", (existente["id"],))
+                    existente = None
+
+            if not existente:
+                trabajo_id = uuid.uuid4().hex
+                archivo = os.path.join(directorio, f"{tipo}_{clave[:16]}.{extension}")
+                db.execute("""
+                    INSERT INTO trabajos (id, clave, tipo, parametros, estado, archivo, creado_en)
+                    VALUES (?, ?, ?, ?, 'pendiente', ?, ?)
+                """, (trabajo_id, clave, tipo, json.dumps(parametros), archivo, fechas.ahora_texto()))
+    except sqlite3.IntegrityError:
+        # Otro pedido registró la misma clave primero: se usa ese trabajo
+        return db.execute("SELECT * FROM trabajos WHERE clave = ?", (clave,)).fetchone()
+
+    for archivo_viejo in borrar:
+        if os.path.exists(archivo_viejo):
+            os.remove(archivo_viejo)
+
+    if existente:
+        return existente
+
+    _obtener_pool(opciones["TRABAJOS_PROCESOS"]).submit(ejecutar_trabajo, opciones, trabajo_id)
+    return db.execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+
+
+def obtener_trabajo(db, trabajo_id):
+    return db.execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+
+
+def ejecutar_trabajo(opciones, trabajo_id):
+    """Corre en el proceso hijo: genera el archivo y deja el resultado en la tabla."""
+    from werkzeug.datastructures import MultiDict
+    from db import conectar
+    from app.routes import reportes
+
+    db = conectar(opciones)
+    try:
+        trabajo = db.execute("SELECT * FROM trabajos WHERE id = ?", (trabajo_id,)).fetchone()
+        db.execute("UPDATE trabajos SET estado = 'en_proceso' WHERE id = ?", (trabajo_id,))
+        db.commit()
+
+        args = MultiDict(json.loads(trabajo["parametros"]))
+        temporal = trabajo["archivo"] + ".tmp"
+        try:
+            with open(temporal, "wb") as destino:
+                if trabajo["tipo"] == "ventas_pdf":
+                    reportes.escribir_pdf_ventas(db, args, destino)
+                elif trabajo["tipo"] == "ventas_csv":
+                    for parte in reportes.generar_csv_ventas(db, args, args.get("nivel", "ventas")):
+                        destino.write(parte.encode("utf-8"))
+                elif trabajo["tipo"] == "ganancias_netas":
+                    destino.write(json.dumps(reportes.calcular_ganancias_netas(db)).encode("utf-8"))
+            # Atómico: nunca se sirve un archivo a medio escribir
+            os.replace(temporal, trabajo["archivo"])
+        except Exception as e:
+            if os.path.exists(temporal):
+                os.remove(temporal)
+            db.execute("""
+                UPDATE trabajos SET estado = 'error', error = ?, terminado_en = ? WHERE id = ?
+            """, (str(e), fechas.ahora_texto(), trabajo_id))
+            db.commit()
+            return
+
+        db.execute("""
+            UPDATE trabajos SET estado = 'listo', terminado_en = ? WHERE id = ?
+        """, (fechas.ahora_texto(), trabajo_id))
+        db.commit()
+    finally:
+        db.close()
@@ -0,0 +1,88 @@
+"""
+Benchmark de /productos/autocomplete.
+Siembra un catálogo con ofertas y compara el cálculo de precios anterior (por cada
+producto: UPDATE + COMMIT de las ofertas vencidas, el precio y el JOIN de ofertas)
+contra el actual (índice de ofertas en memoria, todo el lote de una vez). Después
+mide la latencia por tecla del endpoint.
+
+Uso: python benchmarks/bench_autocomplete.py [productos] [ofertas]
+"""
+import sys
+from datetime import timedelta
+
+from comun import crear_entorno, medir, imprimir
+
+from app.utils import fechas
+
+CONSULTAS = ["man", "Producto 1", "42"]
+
+OFERTAS_ANTERIOR = """
+    SELECT o.*, op.*
+    FROM ofertas o
+    JOIN oferta_productos op ON o.id = op.oferta_id
+    WHERE op.producto_id = ?
+    AND o.activo = 1
+    AND o.fecha_inicio <= ?
+    AND o.fecha_fin >= ?
+    ORDER BY o.fecha_inicio DESC
+"""
+
+
+def precios_anterior(db, ids):
+    """Las consultas que hacía calcular_precio_con_oferta por cada fila del autocomplete."""
+    ahora = fechas.ahora_texto()
+    for producto_id in ids:
+        # desactivar_ofertas_expiradas() corría en cada llamada
+        db.execute("UPDATE ofertas SET activo = 0 WHERE fecha_fin < ? AND activo = 1", (ahora,))
+        db.commit()
+        db.execute("SELECT precio FROM productos WHERE id = ?", (producto_id,)).fetchone()
+        db.execute(OFERTAS_ANTERIOR, (producto_id, ahora, ahora)).fetchall()
+
+
+def sembrar(productos, ofertas):
+    def _sembrar(conn):
+        conn.executemany("""
+            INSERT INTO productos (nombre, precio, stock, categoria_id, unidad_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(f"Producto {i} manzana", 100 + i % 900, 1000, 1 + i % 4, 1 + i % 3)
+              for i in range(productos)])
+
+        inicio = (fechas.ahora() - timedelta(days=1)).strftime(fechas.FORMATO)
+        fin = (fechas.ahora() + timedelta(days=1)).strftime(fechas.FORMATO)
+        tipos = ["individual_precio", "individual_cantidad", "conjunto_descuento"]
+        for i in range(ofertas):
+            cur = conn.execute("""
+                INSERT INTO ofertas (nombre, descripcion, fecha_inicio, fecha_fin, tipo_oferta, descuento_global)
+                VALUES (?, '', ?, ?, ?, 0)
+            """, (f"Oferta {i}", inicio, fin, tipos[i % 3]))
+            conn.execute("""
+                INSERT INTO oferta_productos (oferta_id, producto_id, precio_oferta, cantidad_minima, descuento_porcentaje)
+                VALUES (?, ?, 50, 3, 10)
+            """, (cur.lastrowid, 1 + i % productos))
+    return _sembrar
+
+
+if __name__ == "__main__":
+    productos = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    ofertas = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    app, client, _ = crear_entorno(sembrar(productos, ofertas))
+
+    from db import get_db
+    from app.utils.busqueda import buscar_productos
+    from app.routes.productos import calcular_precios_lote
+
+    # La búsqueda es la misma en los dos casos: solo cambia el cálculo de precios
+    with app.app_context():
+        db = get_db()
+        for q in CONSULTAS:
+            filas = buscar_productos(db, q, limite=10)
+            print(f"--- q={q!r} ({len(filas)} productos)")
+            imprimir("precios anterior (por fila)", medir(lambda: precios_anterior(db, [f["id"] for f in filas])))
+            imprimir("precios actual (índice)", medir(lambda: calcular_precios_lote(
+                db, [(f["id"], 3) for f in filas], precios_base={f["id"]: f["precio"] for f in filas})))
+
+    print("--- endpoint")
+    for q in CONSULTAS:
+        stats = medir(lambda: client.get(f"/productos/autocomplete?q={q}&cantidad=3"))
+        imprimir(f"autocomplete q={q!r}", stats)
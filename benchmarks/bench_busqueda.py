@@ -0,0 +1,54 @@
+"""
+Benchmark de la búsqueda de productos sobre un catálogo grande.
+Compara el LIKE '%q%' original, la búsqueda de respaldo (sin FTS5) y FTS5.
+
+Uso: python benchmarks/bench_busqueda.py [productos]
+"""
+import sys
+import itertools
+
+from comun import crear_entorno, medir, imprimir
+
+FRUTAS = ["Manzana", "Banana", "Papa", "Tubérculo", "Lechuga", "Zanahoria", "Cebolla", "Tomate",
+          "Limón", "Batata", "Calabaza", "Espárrago", "Brócoli", "Ají", "Pimiento", "Durazno"]
+VARIEDADES = ["Roja", "Blanca", "Orgánica", "Jugosa", "Grande", "Mini", "Criolla", "Premium",
+              "Andina", "del Sur"]
+
+CONSULTAS = ["man", "papa bla", "tuberculo", "brocoli premium 7", "zzz"]
+
+
+def sembrar(productos):
+    def _sembrar(conn):
+        nombres = itertools.cycle(itertools.product(FRUTAS, VARIEDADES))
+        conn.executemany("""
+            INSERT INTO productos (nombre, precio, stock, categoria_id, unidad_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(f"{f} {v} {i}", 100 + i % 900, 100, 1 + i % 4, 1 + i % 3)
+              for i, (f, v) in zip(range(productos), nombres)])
+    return _sembrar
+
+
+if __name__ == "__main__":
+    productos = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    app, client, _ = crear_entorno(sembrar(productos))
+
+    from db import get_db
+    from app.utils.busqueda import buscar_productos
+
+    with app.app_context():
+        db = get_db()
+        for q in CONSULTAS:
+            print(f"--- q={q!r}")
+            like = lambda: db.execute("""
+                SELECT p.id, p.nombre, p.precio, u.nombre AS unidad
+                FROM productos p LEFT JOIN unidades u ON p.unidad_id = u.id
+                WHERE p.nombre LIKE ? LIMIT 10
+            """, (f"%{q}%",)).fetchall()
+            imprimir("LIKE '%q%' (original)", medir(like, 50))
+            imprimir("respaldo sin FTS5", medir(lambda: buscar_productos(db, q, usar_fts=False), 20))
+            imprimir("FTS5", medir(lambda: buscar_productos(db, q, usar_fts=True), 200))
+
+    print("--- endpoint")
+    for q in CONSULTAS:
+        imprimir(f"/productos/autocomplete q={q!r}",
+                 medir(lambda: client.get("/productos/autocomplete", query_string={"q": q})))
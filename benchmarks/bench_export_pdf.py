@@ -0,0 +1,73 @@
+"""
+Benchmark de /reportes/export/pdf y /reportes/venta/<id>.
+Siembra un historial de ventas con varias líneas cada una y mide el export
+(el historial completo, armado en tablas de PDF_FILAS_TABLA filas) junto con la
+cantidad de consultas ejecutadas.
+
+Uso: python benchmarks/bench_export_pdf.py [ventas] [lineas_por_venta]
+"""
+import sys
+from datetime import datetime, timedelta
+
+from comun import crear_entorno, medir, imprimir
+
+from app.utils.fechas import FORMATO
+
+
+def sembrar(ventas, lineas, productos=200):
+    def _sembrar(conn):
+        conn.executemany("""
+            INSERT INTO productos (nombre, precio, stock, categoria_id, unidad_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(f"Producto {i}", 100 + i, 1000, 1 + i % 4, 1 + i % 3) for i in range(productos)])
+
+        # init_db ya carga algunas ventas de ejemplo: seguir desde la última
+        base = conn.execute("SELECT COALESCE(MAX(id), 0) FROM ventas").fetchone()[0]
+        ids = range(base + 1, base + ventas + 1)
+
+        inicio = datetime.now() - timedelta(days=365)
+        conn.executemany("INSERT INTO ventas (id, fecha, total) VALUES (?, ?, ?)", [
+            (v, (inicio + timedelta(minutes=50 * (v - base))).strftime(FORMATO), 100.0 * lineas)
+            for v in ids
+        ])
+        conn.executemany("""
+            INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, subtotal)
+            VALUES (?, ?, ?, ?)
+        """, [
+            (v, 1 + (v * 7 + l) % productos, 1 + l, 100.0)
+            for v in ids for l in range(lineas)
+        ])
+    return _sembrar
+
+
+def contar_consultas(funcion):
+    """Ejecuta `funcion` contando las sentencias que llegan a la conexión del request."""
+    import db as modulo_db
+    contador = [0]
+    conectar = modulo_db.conectar
+
+    def conectar_contando(opciones=None):
+        conn = conectar(opciones)
+        conn.set_trace_callback(lambda _: contador.__setitem__(0, contador[0] + 1))
+        return conn
+
+    modulo_db.conectar = conectar_contando
+    modulo_db._local.conexiones = {}
+    try:
+        funcion()
+    finally:
+        modulo_db.conectar = conectar
+        modulo_db._local.conexiones = {}
+    return contador[0]
+
+
+if __name__ == "__main__":
+    ventas = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lineas = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+
+    app, client, ruta = crear_entorno(sembrar(ventas, lineas))
+
+    export = lambda: client.get("/reportes/export/pdf")
+    print(f"consultas por export: {contar_consultas(export)}")
+    imprimir(f"export/pdf ({ventas} ventas)", medir(export, repeticiones=3, calentamiento=1))
+    imprimir("venta/<id>", medir(lambda: client.get("/reportes/venta/1")))
@@ -0,0 +1,103 @@
+"""
+Benchmark y caso de control de /reportes/ganancias_netas.
+
+Primero arma un caso chico con resultado conocido y compara la consulta anterior
+(AVG correlacionado sobre ingresos_stock + SUM(v.total) con JOIN a las líneas)
+contra la actual: la anterior suma el total de cada venta una vez por línea. Si la
+actual no da el resultado esperado termina con error.
+Después mide las dos con un historial grande.
+
+Uso: python benchmarks/bench_ganancias.py [ventas] [ingresos]
+"""
+import sys
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from comun import crear_entorno, medir, imprimir
+
+import init_db
+from app.utils.fechas import FORMATO
+
+CONSULTA_ANTERIOR = """
+    SELECT
+        substr(v.fecha,1,10) AS dia,
+        SUM(v.total) AS venta_total,
+        COALESCE(SUM(d.cantidad * COALESCE((
+            SELECT AVG(i.precio_unitario)
+            FROM ingresos_stock i
+            WHERE i.producto_id = d.producto_id
+        ), 0)), 0) AS costo_total
+    FROM ventas v
+    LEFT JOIN detalle_ventas d ON v.id = d.venta_id
+    GROUP BY dia
+    ORDER BY dia ASC
+"""
+
+
+def caso_control(conn):
+    # Un producto comprado 10 a $100 y 30 a $200: promedio simple 150, ponderado 175,
+    # FIFO de las primeras 4 unidades 100. Una venta el 2030-01-01 con dos líneas
+    # (2 + 2 unidades) por $1000 en total.
+    conn.execute("DELETE FROM detalle_pago")
+    conn.execute("DELETE FROM detalle_ventas")
+    conn.execute("DELETE FROM ventas")
+    cur = conn.execute("INSERT INTO productos (nombre, precio, stock) VALUES ('Control', 250, 100)")
+    producto_id = cur.lastrowid
+    conn.executemany("""
+        INSERT INTO ingresos_stock (producto_id, proveedor_id, cantidad, fecha, precio_unitario)
+        VALUES (?, 1, ?, '2030-01-01 00:00:00', ?)
+    """, [(producto_id, 10, 100), (producto_id, 30, 200)])
+    cur = conn.execute("INSERT INTO ventas (fecha, total) VALUES ('2030-01-01 10:00:00', 1000)")
+    conn.executemany("""
+        INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, subtotal) VALUES (?, ?, 2, 500)
+    """, [(cur.lastrowid, producto_id)] * 2)
+
+
+def sembrar(ventas, ingresos, productos=300):
+    def _sembrar(conn):
+        conn.executemany("""
+            INSERT INTO productos (nombre, precio, stock, categoria_id, unidad_id)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(f"Producto {i}", 100 + i, 1000, 1 + i % 4, 1 + i % 3) for i in range(productos)])
+        base = conn.execute("SELECT MAX(id) FROM productos").fetchone()[0] - productos
+
+        conn.executemany("""
+            INSERT INTO ingresos_stock (producto_id, proveedor_id, cantidad, fecha, precio_unitario)
+            VALUES (?, 1, ?, '2025-01-01 00:00:00', ?)
+        """, [(base + 1 + i % productos, 10 + i % 20, 50 + i % 70) for i in range(ingresos)])
+
+        inicio = datetime.now() - timedelta(days=365)
+        for v in range(ventas):
+            cur = conn.execute("INSERT INTO ventas (fecha, total) VALUES (?, 400)", (
+                (inicio + timedelta(minutes=50 * v)).strftime(FORMATO),))
+            conn.executemany("""
+                INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, subtotal) VALUES (?, ?, 1, 100)
+            """, [(cur.lastrowid, base + 1 + (v * 7 + l) % productos) for l in range(4)])
+    return _sembrar
+
+
+if __name__ == "__main__":
+    ventas = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    ingresos = int(sys.argv[2]) if len(sys.argv) > 2 else 5000
+
+    # Caso de control
+    app, client, ruta = crear_entorno(caso_control)
+    init_db.reconstruir_costos(ruta)
+    conn = sqlite3.connect(ruta)
+    anterior = conn.execute(CONSULTA_ANTERIOR).fetchone()
+    actual = client.get("/reportes/ganancias_netas").json[0]
+    print("Caso de control (esperado: venta 1000, costo FIFO 4 x 100 = 400)")
+    print(f"  anterior: venta={anterior[1]} costo={anterior[2]}")
+    print(f"  actual:   venta={actual['venta']} costo={actual['costo']}")
+    if (actual["dia"], actual["venta"], actual["costo"]) != ("2030-01-01", 1000, 400):
+        sys.exit("El caso de control no da lo esperado")
+
+    # Historial grande
+    app, client, ruta = crear_entorno(sembrar(ventas, ingresos))
+    init_db.reconstruir_costos(ruta)
+    conn = sqlite3.connect(ruta)
+    inicio = time.perf_counter()
+    conn.execute(CONSULTA_ANTERIOR).fetchall()
+    print(f"consulta anterior ({ventas} ventas, {ingresos} ingresos): {(time.perf_counter() - inicio) * 1000:.1f}ms")
+    imprimir("ganancias_netas", medir(lambda: client.get("/reportes/ganancias_netas"), repeticiones=50))
@@ -0,0 +1,50 @@
+"""
+Benchmark de /productos/importar: un catálogo de N productos al que se le cambia el
+precio a todos y se le agregan productos nuevos, en CSV.
+
+Uso: python benchmarks/bench_importacion.py [productos] [nuevos]
+"""
+import sys
+import io
+import csv
+import time
+
+from comun import crear_entorno
+
+
+def sembrar(productos):
+    def _sembrar(conn):
+        conn.executemany("""
+            INSERT INTO productos (nombre, precio, stock, categoria_id, unidad_id)
+            VALUES (?, ?, 100, 1, 1)
+        """, [(f"Producto {i}", 100 + i) for i in range(productos)])
+    return _sembrar
+
+
+def lista_de_precios(productos, nuevos):
+    salida = io.StringIO()
+    writer = csv.writer(salida, delimiter=";")
+    writer.writerow(["nombre", "precio", "categoria", "unidad", "stock"])
+    for i in range(productos):
+        writer.writerow([f"producto {i}", f"{(100 + i) * 1.1:.2f}".replace(".", ","), "", "", ""])
+    for i in range(nuevos):
+        writer.writerow([f"Nuevo {i}", "250", "Frutas", "Kg", "10"])
+    return salida.getvalue().encode()
+
+
+if __name__ == "__main__":
+    productos = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    nuevos = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+
+    app, client, ruta = crear_entorno(sembrar(productos))
+    contenido = lista_de_precios(productos, nuevos)
+
+    for simular in ("1", ""):
+        inicio = time.perf_counter()
+        resp = client.post("/productos/importar?formato=json", data={
+            "archivo": (io.BytesIO(contenido), "precios.csv"),
+            "simular": simular,
+        })
+        duracion = (time.perf_counter() - inicio) * 1000
+        print(f"{'simulación' if simular else 'importación'} ({productos + nuevos} filas): "
+              f"{duracion:.1f}ms {resp.status_code} {resp.json['resumen']}")
@@ -0,0 +1,103 @@
+"""
+Prueba de carga de /reportes/stream: N dashboards conectados por HTTP a un servidor
+con hilos (como gunicorn --threads) mientras se registran ventas.
+
+Mide cuánto tarda cada evento "venta" en llegar a cada dashboard desde que empieza el
+POST a /ventas/finalizar, y verifica que todos reciben todas las ventas. Las ventas se
+hacen con el test client en el mismo proceso, así comparten el pub/sub.
+
+Uso: python benchmarks/bench_stream.py [dashboards] [ventas]
+"""
+import sys
+import re
+import json
+import time
+import threading
+import http.client
+
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+from comun import crear_entorno, estadisticas, imprimir
+
+
+def dashboard(puerto, cookie, esperadas, recibidos, conectados):
+    conn = http.client.HTTPConnection("127.0.0.1", puerto, timeout=30)
+    conn.request("GET", "/reportes/stream", headers={"Cookie": cookie})
+    resp = conn.getresponse()
+    assert resp.status == 200, resp.status
+    conectados.release()
+
+    tipo = None
+    while len(recibidos) < esperadas:
+        linea = resp.readline().decode().rstrip("\n")
+        if linea.startswith("event: "):
+            tipo = linea[7:]
+        elif linea.startswith("data: ") and tipo == "venta":
+            recibidos.append((time.perf_counter(), json.loads(linea[6:])))
+        elif not linea:
+            tipo = None
+    conn.close()
+
+
+def vender(client):
+    client.post("/ventas/nueva", data={"producto_id": 1, "cantidad": 1})
+    html = client.get("/ventas/nueva").get_data(as_text=True)
+    total = float(re.findall(r"Total: \$([\d.]+)", html)[0])
+    client.post("/ventas/agregar_metodo_pago", data={"metodo": "Efectivo", "monto": total})
+    inicio = time.perf_counter()
+    resp = client.post("/ventas/finalizar")
+    assert resp.status_code == 200, "la venta no se registró"
+    return inicio, (time.perf_counter() - inicio) * 1000
+
+
+class SinLog(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def sembrar(conn):
+    conn.execute("UPDATE productos SET stock = 1000000 WHERE id = 1")
+
+
+if __name__ == "__main__":
+    dashboards = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    ventas = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    app, client, ruta = crear_entorno(sembrar)
+    app.config["EVENTOS_HEARTBEAT"] = 1
+
+    # Línea de base: finalizar sin nadie escuchando
+    sin_dashboards = [vender(client)[1] for _ in range(ventas)]
+
+    servidor = make_server("127.0.0.1", 0, app, threaded=True, request_handler=SinLog)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+
+    sesion = {"user_id": 1, "username": "admin", "role": "admin"}
+    cookie = f"session={app.session_interface.get_signing_serializer(app).dumps(sesion)}"
+
+    conectados = threading.Semaphore(0)
+    recibidos = [[] for _ in range(dashboards)]
+    hilos = [threading.Thread(target=dashboard, args=(servidor.server_port, cookie, ventas, r, conectados))
+             for r in recibidos]
+    for h in hilos:
+        h.start()
+    for _ in hilos:
+        conectados.acquire()
+    time.sleep(0.2)  # que todos lleguen a suscribirse
+
+    inicios, con_dashboards = [], []
+    for _ in range(ventas):
+        inicio, duracion = vender(client)
+        inicios.append(inicio)
+        con_dashboards.append(duracion)
+
+    for h in hilos:
+        h.join(timeout=30)
+    servidor.shutdown()
+
+    completos = sum(len(r) == ventas for r in recibidos)
+    latencias = [(llegada - inicios[i]) * 1000 for r in recibidos for i, (llegada, _) in enumerate(r)]
+    print(f"{dashboards} dashboards, {ventas} ventas: {completos}/{dashboards} recibieron todas")
+    imprimir("finalizar (sin dashboards)", estadisticas(sin_dashboards))
+    imprimir(f"finalizar ({dashboards} dashboards)", estadisticas(con_dashboards))
+    imprimir("venta -> dashboard", estadisticas(latencias))
@@ -0,0 +1,118 @@
+"""
+Utilidades compartidas por los benchmarks.
+Cada benchmark arma una base temporal (nunca toca database.db) y usa el test client de Flask.
+"""
+import os
+import sys
+import sqlite3
+import tempfile
+import time
+import math
+import threading
+import statistics
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+import init_db
+
+
+def crear_entorno(sembrar=None):
+    """
+    Crea una base temporal con el esquema de init_db, la siembra con `sembrar(conn)`
+    y devuelve (app, client, ruta_db) con una sesión de admin ya iniciada.
+    """
+    ruta = os.path.join(tempfile.mkdtemp(prefix="verduleria-bench-"), "bench.db")
+    init_db.init_db(ruta)
+
+    if sembrar:
+        conn = sqlite3.connect(ruta)
+        sembrar(conn)
+        conn.commit()
+        conn.close()
+
+    from app import create_app
+    app = create_app({"DATABASE": ruta, "TESTING": True})
+
+    return app, cliente_admin(app), ruta
+
+
+def cliente_admin(app):
+    """Test client con la sesión del admin (uno por hilo en las pruebas concurrentes)."""
+    client = app.test_client()
+    with client.session_transaction() as s:
+        s["user_id"] = 1
+        s["username"] = "admin"
+        s["role"] = "admin"
+    return client
+
+
+def estadisticas(tiempos, duracion=None):
+    """Latencias en milisegundos -> n, media, p50/p95/p99 y operaciones por segundo."""
+    tiempos = sorted(tiempos)
+    percentil = lambda p: tiempos[max(0, math.ceil(len(tiempos) * p) - 1)]
+    duracion = duracion if duracion is not None else sum(tiempos) / 1000
+    return {
+        "n": len(tiempos),
+        "media_ms": statistics.mean(tiempos),
+        "p50_ms": percentil(0.50),
+        "p95_ms": percentil(0.95),
+        "p99_ms": percentil(0.99),
+        "ops_s": len(tiempos) / duracion if duracion else 0,
+    }
+
+
+def medir(funcion, repeticiones=200, calentamiento=10, preparar=None):
+    """
+    Ejecuta `funcion` varias veces y devuelve estadísticas de latencia en milisegundos.
+    `preparar`, si se pasa, corre antes de cada repetición sin contar en el tiempo.
+    """
+    for _ in range(calentamiento):
+        if preparar:
+            preparar()
+        funcion()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        if preparar:
+            preparar()
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+
+    return estadisticas(tiempos)
+
+
+def medir_concurrente(crear_funcion, hilos, repeticiones=200):
+    """
+    Corre `repeticiones` llamadas repartidas en `hilos` hilos; cada hilo usa su propia
+    función (`crear_funcion()`, ej. con su propio test client). El throughput es sobre
+    el tiempo total de reloj, no sobre la suma de latencias.
+    """
+    funciones = [crear_funcion() for _ in range(hilos)]
+    tiempos = []
+    lock = threading.Lock()
+
+    def trabajar(funcion, veces):
+        propios = []
+        for _ in range(veces):
+            inicio = time.perf_counter()
+            funcion()
+            propios.append((time.perf_counter() - inicio) * 1000)
+        with lock:
+            tiempos.extend(propios)
+
+    trabajadores = [threading.Thread(target=trabajar, args=(f, repeticiones // hilos)) for f in funciones]
+    inicio = time.perf_counter()
+    for t in trabajadores:
+        t.start()
+    for t in trabajadores:
+        t.join()
+    return estadisticas(tiempos, time.perf_counter() - inicio)
+
+
+def imprimir(nombre, stats):
+    print(f"{nombre:<40} n={stats['n']:<5} media={stats['media_ms']:.3f}ms "
+          f"p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms p99={stats['p99_ms']:.3f}ms "
+          f"{stats['ops_s']:.0f} ops/s")
@@ -0,0 +1,176 @@
+"""
+Suite de benchmarks de los caminos calientes del punto de venta.
+
+Crea una base sintética (init_db.sembrar_sintetico) a la escala pedida y mide con el
+test client de Flask: autocomplete, agregar al carrito, finalizar venta, reportes,
+dashboard y exports. Informa p50/p95/p99 y operaciones por segundo, y guarda todo en
+benchmarks/resultados/ como JSON para comparar entre commits.
+
+Uso:
+    python benchmarks/suite.py [--escala chica|media|grande] [--ventas N] [--productos N]
+                               [--repeticiones N] [--hilos N] [--solo texto]
+                               [--comparar resultados/anterior.json]
+"""
+import os
+import re
+import sys
+import json
+import random
+import argparse
+import platform
+import sqlite3
+import subprocess
+from datetime import datetime, timedelta
+
+from comun import crear_entorno, cliente_admin, medir, medir_concurrente, imprimir
+
+import init_db
+from app.utils.cache import invalidar_cache
+
+RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(RESULTADOS)).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def casos(app, client, ruta, repeticiones):
+    """
+    Lista de (nombre, funcion, opciones). `crear` arma una función con su propio
+    cliente para las mediciones concurrentes (solo en los casos de lectura).
+    """
+    conn = sqlite3.connect(ruta)
+    ids_productos = [r[0] for r in conn.execute("SELECT id FROM productos WHERE stock > 1000")]
+    ids_ventas = [r[0] for r in conn.execute("SELECT id FROM ventas")]
+    conn.close()
+    rnd = random.Random(1)
+
+    hasta = datetime.now().strftime("%Y-%m-%d")
+    desde = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+    ultimo_mes = f"fecha_desde={desde}&fecha_hasta={hasta}"
+
+    def autocomplete(c):
+        consultas = ["man", "pa", "tom", "lech", "naranja r", "ce", "Banana Criolla 1"]
+        estado = {"i": 0}
+
+        def pedir():
+            estado["i"] += 1
+            c.get(f"/productos/autocomplete?q={consultas[estado['i'] % len(consultas)]}&cantidad=1")
+        return pedir
+
+    def leer(c, url):
+        return lambda: c.get(url)
+
+    # Carrito: cada 10 productos se empieza uno nuevo para que no crezca sin límite
+    agregados = {"n": 0}
+
+    def nuevo_carrito():
+        agregados["n"] += 1
+        if agregados["n"] % 10 == 0:
+            with client.session_transaction() as s:
+                s.pop("carrito_id", None)
+
+    def preparar_venta():
+        with client.session_transaction() as s:
+            s.pop("carrito_id", None)
+            s["metodos_pago_session"] = []
+        for pid in rnd.sample(ids_productos, 3):
+            client.post("/ventas/nueva", data={"producto_id": pid, "cantidad": 1})
+        html = client.get("/ventas/nueva").get_data(as_text=True)
+        total = float(re.findall(r"Total: \$([\d.]+)", html)[0])
+        client.post("/ventas/agregar_metodo_pago", data={"metodo": "Efectivo", "monto": total})
+
+    def finalizar():
+        resp = client.post("/ventas/finalizar")
+        assert resp.status_code == 200, "la venta no se registró"
+
+    pocas = max(3, repeticiones // 20)
+    return [
+        ("productos.autocomplete", autocomplete(client), {"crear": lambda: autocomplete(cliente_admin(app))}),
+        ("ventas.nueva POST", lambda: client.post("/ventas/nueva", data={
+            "producto_id": rnd.choice(ids_productos), "cantidad": 1}), {"preparar": nuevo_carrito}),
+        ("ventas.finalizar", finalizar, {"preparar": preparar_venta}),
+        ("reportes.index", leer(client, "/reportes/"),
+         {"crear": lambda: leer(cliente_admin(app), "/reportes/")}),
+        ("reportes.index (último mes)", leer(client, f"/reportes/?{ultimo_mes}"), {}),
+        ("reportes.ver_venta", lambda: client.get(f"/reportes/venta/{rnd.choice(ids_ventas)}"), {}),
+        ("reportes.data (sin cache)", leer(client, "/reportes/data"), {"preparar": invalidar_cache}),
+        ("reportes.data (cache)", leer(client, "/reportes/data"),
+         {"crear": lambda: leer(cliente_admin(app), "/reportes/data")}),
+        ("reportes.ganancias_netas (sin cache)", leer(client, "/reportes/ganancias_netas"),
+         {"preparar": invalidar_cache}),
+        ("reportes.top_proveedores (sin cache)", leer(client, "/reportes/top_proveedores"),
+         {"preparar": invalidar_cache}),
+        ("reportes.export_csv (último mes)", lambda: client.get(f"/reportes/export/csv?{ultimo_mes}").get_data(),
+         {"repeticiones": pocas}),
+        ("reportes.export_pdf (último mes)", lambda: client.get(f"/reportes/export/pdf?{ultimo_mes}").get_data(),
+         {"repeticiones": pocas}),
+    ]
+
+
+def comparar(actual, anterior):
+    print(f"\nComparación con {anterior.get('commit') or '?'} ({anterior['fecha']}):")
+    for nombre, stats in actual["resultados"].items():
+        previo = anterior["resultados"].get(nombre)
+        if not previo:
+            continue
+        cambios = "  ".join(
+            f"{clave[:-3]} {(stats[clave] - previo[clave]) / previo[clave] * 100:+.0f}%"
+            for clave in ("p50_ms", "p95_ms", "p99_ms") if previo.get(clave)
+        )
+        print(f"{nombre:<40} {cambios}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--escala", choices=init_db.ESCALAS, default="chica")
+    for cantidad in ("productos", "ventas", "ofertas", "compras"):
+        parser.add_argument(f"--{cantidad}", type=int)
+    parser.add_argument("--repeticiones", type=int, default=200)
+    parser.add_argument("--hilos", type=int, default=1, help="además, medir los casos de lectura con N hilos")
+    parser.add_argument("--solo", help="correr solo los casos cuyo nombre contenga este texto")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior")
+    opciones = parser.parse_args()
+
+    escala = dict(init_db.ESCALAS[opciones.escala])
+    escala.update({k: getattr(opciones, k) for k in escala if getattr(opciones, k) is not None})
+
+    app, client, ruta = crear_entorno(lambda conn: init_db.sembrar_sintetico(conn, **escala))
+    init_db.reconstruir_costos(ruta)
+
+    resultado = {
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit_actual(),
+        "escala": escala,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "resultados": {},
+    }
+
+    for nombre, funcion, extra in casos(app, client, ruta, opciones.repeticiones):
+        if opciones.solo and opciones.solo not in nombre:
+            continue
+        stats = medir(funcion, repeticiones=extra.get("repeticiones", opciones.repeticiones),
+                      calentamiento=min(10, extra.get("repeticiones", 10)), preparar=extra.get("preparar"))
+        resultado["resultados"][nombre] = stats
+        imprimir(nombre, stats)
+
+        if opciones.hilos > 1 and "crear" in extra:
+            nombre = f"{nombre} ({opciones.hilos} hilos)"
+            stats = medir_concurrente(extra["crear"], opciones.hilos, opciones.repeticiones)
+            resultado["resultados"][nombre] = stats
+            imprimir(nombre, stats)
+
+    os.makedirs(RESULTADOS, exist_ok=True)
+    archivo = os.path.join(RESULTADOS, f"{datetime.now():%Y%m%d-%H%M%S}-{resultado['commit'] or 'sin-commit'}.json")
+    with open(archivo, "w") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nResultados guardados en {archivo}")
+
+    if opciones.comparar:
+        with open(opciones.comparar) as f:
+            comparar(resultado, json.load(f))
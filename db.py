@@ -1,19 +1,151 @@
 import sqlite3
 import hashlib
-from flask import g
+import threading
+import time
+from contextlib import contextmanager
+from flask import g, current_app, has_app_context
 
 DB_NAME = "database.db"
 
+# -----------------------
+# Configuración de las conexiones (se puede pisar desde app.config)
+# -----------------------
+CONFIG_SQLITE = {
+    "DATABASE": None,                    # None = DB_NAME
+    "SQLITE_JOURNAL_MODE": "WAL",        # lectores y la caja que escribe no se bloquean entre sí
+    "SQLITE_SYNCHRONOUS": "NORMAL",      # seguro con WAL y mucho más rápido que FULL
+    "SQLITE_BUSY_TIMEOUT": 5000,         # ms esperando el lock antes de "database is locked"
+    "SQLITE_FOREIGN_KEYS": True,
+    "SQLITE_MMAP_SIZE": 64 * 1024 * 1024,
+    "SQLITE_CACHE_SIZE": -16000,         # negativo = KiB
+    "SQLITE_CACHED_STATEMENTS": 256,
+    "SQLITE_REUSAR_CONEXIONES": True,    # una conexión por hilo del worker en vez de una por request
+    "SQLITE_PERFIL": False,              # medir cada consulta (app/utils/perfil_sql.py)
+}
+
+_local = threading.local()
+
+
+def _config():
+    config = current_app.config if has_app_context() else {}
+    opciones = {clave: config.get(clave, valor) for clave, valor in CONFIG_SQLITE.items()}
+    opciones["DATABASE"] = opciones["DATABASE"] or DB_NAME
+    return opciones
+
+
+# -----------------------
+# Conexión medida (SQLITE_PERFIL)
+# -----------------------
+# Cronometra execute/executemany, de la conexión y de sus cursores, y le pasa cada
+# consulta al perfil del request en curso (g.perfil_sql), si hay uno. El tiempo incluye
+# preparar la consulta y obtener la primera fila; lo que se itera después no cuenta.
+
+def _registrar_consulta(sql, inicio):
+    perfil = g.get("perfil_sql") if has_app_context() else None
+    if perfil is not None:
+        perfil.registrar(sql, time.perf_counter() - inicio)
+
+
+class CursorPerfilado(sqlite3.Cursor):
+    def execute(self, sql, *args):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            _registrar_consulta(sql, inicio)
+
+    def executemany(self, sql, *args):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            _registrar_consulta(sql, inicio)
+
+
+class ConexionPerfilada(sqlite3.Connection):
+    def cursor(self, factory=CursorPerfilado):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        inicio = time.perf_counter()
+        try:
+            return super().execute(sql, *args)
+        finally:
+            _registrar_consulta(sql, inicio)
+
+    def executemany(self, sql, *args):
+        inicio = time.perf_counter()
+        try:
+            return super().executemany(sql, *args)
+        finally:
+            _registrar_consulta(sql, inicio)
+
+
+def conectar(opciones=None):
+    """Abre una conexión nueva con los pragmas configurados."""
+    opciones = opciones or _config()
+
+    conn = sqlite3.connect(
+        opciones["DATABASE"],
+        timeout=opciones["SQLITE_BUSY_TIMEOUT"] / 1000,
+        cached_statements=opciones["SQLITE_CACHED_STATEMENTS"],
+        factory=ConexionPerfilada if opciones.get("SQLITE_PERFIL") else sqlite3.Connection
+    )
+    conn.row_factory = sqlite3.Row
+
+    # Los pragmas van por el execute de sqlite3.Connection: con SQLITE_PERFIL no son
+    # consultas del request que abrió la conexión y no se miden
+    pragma = lambda sql: sqlite3.Connection.execute(conn, sql)
+    pragma(f"PRAGMA journal_mode = {opciones['SQLITE_JOURNAL_MODE']}")
+    pragma(f"PRAGMA synchronous = {opciones['SQLITE_SYNCHRONOUS']}")
+    pragma(f"PRAGMA busy_timeout = {int(opciones['SQLITE_BUSY_TIMEOUT'])}")
+    pragma(f"PRAGMA foreign_keys = {'ON' if opciones['SQLITE_FOREIGN_KEYS'] else 'OFF'}")
+    pragma(f"PRAGMA mmap_size = {int(opciones['SQLITE_MMAP_SIZE'])}")
+    pragma(f"PRAGMA cache_size = {int(opciones['SQLITE_CACHE_SIZE'])}")
+    return conn
+
+
 def get_db():
     if "db" not in g:
-        g.db = sqlite3.connect(DB_NAME)
-        g.db.row_factory = sqlite3.Row
+        opciones = _config()
+        if opciones["SQLITE_REUSAR_CONEXIONES"]:
+            conexiones = getattr(_local, "conexiones", None)
+            if conexiones is None:
+                conexiones = _local.conexiones = {}
+            clave = (opciones["DATABASE"], opciones["SQLITE_PERFIL"])
+            if clave not in conexiones:
+                conexiones[clave] = conectar(opciones)
+            g.db = conexiones[clave]
+            g.db_reusada = True
+        else:
+            g.db = conectar(opciones)
+            g.db_reusada = False
     return g.db
 
 def close_db(e=None):
     db = g.pop("db", None)
     if db:
-        db.close()
+        if g.pop("db_reusada", False):
+            # La conexión sigue viva para el próximo request del mismo hilo:
+            # no dejar transacciones abiertas colgando
+            if db.in_transaction:
+                db.rollback()
+        else:
+            db.close()
+
+@contextmanager
+def transaccion(db):
+    """
+    Ejecuta el bloque en una transacción BEGIN IMMEDIATE: toma el lock de escritura
+    al empezar, hace COMMIT al salir y ROLLBACK si hubo una excepción.
+    """
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    db.commit()
 
 def hash_pass(password):
     return hashlib.sha256(password.encode()).hexdigest()
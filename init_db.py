@@ -6,8 +6,8 @@ DB_NAME = "database.db"
 def hash_pass(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def init_db():
-    conn = sqlite3.connect(DB_NAME)
+def init_db(db_name=None):
+    conn = sqlite3.connect(db_name or DB_NAME)
     cursor = conn.cursor()
 
     # -----------------------
@@ -187,11 +187,11 @@ def init_db():
         print("Cargando ventas de prueba...")
 
         ventas = [
-            ("2025-01-10", 5600),
-            ("2025-01-11", 3200),
-            ("2025-01-12", 8900),
-            ("2025-01-13", 4500),
-            ("2025-01-14", 12000)
+            ("2025-01-10 12:00:00", 5600),
+            ("2025-01-11 12:00:00", 3200),
+            ("2025-01-12 12:00:00", 8900),
+            ("2025-01-13 12:00:00", 4500),
+            ("2025-01-14 12:00:00", 12000)
         ]
 
         cursor.executemany("INSERT INTO ventas (fecha, total) VALUES (?, ?)", ventas)
@@ -255,6 +255,17 @@ def init_db():
     );
     """)
 
+    # Columnas para el carrito del lado del servidor (estado y versión para el cache)
+    try:
+        cursor.execute("ALTER TABLE carritos_pendientes ADD COLUMN estado TEXT NOT NULL DEFAULT 'activo'")
+    except sqlite3.OperationalError:
+        pass  # La columna ya existe
+
+    try:
+        cursor.execute("ALTER TABLE carritos_pendientes ADD COLUMN version INTEGER NOT NULL DEFAULT 0")
+    except sqlite3.OperationalError:
+        pass  # La columna ya existe
+
     # -----------------------
     # Tabla métodos de pago
     # -----------------------
@@ -297,8 +308,8 @@ def init_db():
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         nombre TEXT NOT NULL,
         descripcion TEXT,
-        fecha_inicio TEXT NOT NULL,  -- formato YYYY-MM-DD HH:MM
-        fecha_fin TEXT NOT NULL,     -- formato YYYY-MM-DD HH:MM
+        fecha_inicio TEXT NOT NULL,  -- formato YYYY-MM-DD HH:MM:SS (app/utils/fechas.py)
+        fecha_fin TEXT NOT NULL,     -- formato YYYY-MM-DD HH:MM:SS
         tipo_oferta TEXT NOT NULL,   -- 'individual_precio', 'individual_cantidad', 'conjunto_descuento'
         activo INTEGER DEFAULT 1,    -- 1=activa, 0=inactiva
         descuento_global REAL DEFAULT 0  -- para ofertas de conjunto (porcentaje 0-100)
@@ -322,8 +333,711 @@ def init_db():
     """)
 
     conn.commit()
+
+    aplicar_migraciones(conn)
     conn.close()
     print("Base de datos creada con datos de ejemplo.")
 
+
+# --------------------------------------------------------------
+# MIGRACIONES VERSIONADAS
+# --------------------------------------------------------------
+# Cada migración se aplica una sola vez y queda registrada en schema_version.
+# Para agregar una nueva: escribir la función y sumarla al final de MIGRACIONES
+# con el número siguiente (nunca renumerar ni modificar las ya publicadas).
+
+def _migracion_indices_secundarios(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detalle_ventas_venta ON detalle_ventas(venta_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detalle_ventas_producto ON detalle_ventas(producto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detalle_pago_venta ON detalle_pago(venta_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingresos_producto ON ingresos_stock(producto_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ingresos_proveedor ON ingresos_stock(proveedor_id, fecha)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_oferta_productos_producto ON oferta_productos(producto_id, oferta_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_oferta_productos_oferta ON oferta_productos(oferta_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_ventas_fecha ON ventas(fecha)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_productos_nombre ON productos(nombre)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_detalle_carritos_carrito ON detalle_carritos(carrito_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_carritos_usuario ON carritos_pendientes(usuario_id, estado)")
+    cursor.execute("ANALYZE")
+
+
+def _migracion_busqueda_productos(cursor):
+    # Índice de texto completo sobre productos.nombre (sin acentos, con prefijos).
+    # Si el SQLite no trae FTS5 la app usa la búsqueda con LIKE de respaldo.
+    try:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS productos_fts USING fts5(
+            nombre,
+            content='productos',
+            content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        );
+        """)
+    except sqlite3.OperationalError:
+        print("SQLite sin FTS5: se usará la búsqueda de respaldo")
+        return
+
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS productos_fts_ai AFTER INSERT ON productos BEGIN
+        INSERT INTO productos_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS productos_fts_ad AFTER DELETE ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+    END;
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS productos_fts_au AFTER UPDATE OF nombre ON productos BEGIN
+        INSERT INTO productos_fts(productos_fts, rowid, nombre) VALUES ('delete', old.id, old.nombre);
+        INSERT INTO productos_fts(rowid, nombre) VALUES (new.id, new.nombre);
+    END;
+    """)
+    cursor.execute("INSERT INTO productos_fts(productos_fts) VALUES ('rebuild')")
+
+
+def _migracion_descartar_estadisticas(cursor):
+    # La migración 1 corre ANALYZE con la base casi vacía (una migración publicada
+    # no se modifica, así que se deshace acá): con esas estadísticas el planificador
+    # cree que productos tiene 5 filas y prefiere recorrerla entera antes que buscar
+    # por id. Sin sqlite_stat1 usa sus heurísticas por defecto, que eligen bien los índices.
+    cursor.execute("DROP TABLE IF EXISTS sqlite_stat1")
+
+
+def _migracion_version_catalogo(cursor):
+    # Contador de versión del catálogo: cada escritura de productos, stock u ofertas
+    # lo incrementa y marca las filas afectadas, así /productos/catalogo puede
+    # devolver solo lo que cambió desde una versión dada.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS catalogo_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER NOT NULL
+    );
+    """)
+    cursor.execute("INSERT OR IGNORE INTO catalogo_version (id, version) VALUES (1, 1)")
+
+    try:
+        cursor.execute("ALTER TABLE productos ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+    except sqlite3.OperationalError:
+        pass  # La columna ya existe
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_productos_version ON productos(version)")
+
+    # Productos borrados (para que las terminales los saquen de su copia local)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS catalogo_eliminados (
+        producto_id INTEGER PRIMARY KEY,
+        version INTEGER NOT NULL
+    );
+    """)
+
+    subir = "UPDATE catalogo_version SET version = version + 1 WHERE id = 1;"
+    actual = "(SELECT version FROM catalogo_version WHERE id = 1)"
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_productos_ai AFTER INSERT ON productos BEGIN
+        {subir}
+        UPDATE productos SET version = {actual} WHERE id = new.id;
+        DELETE FROM catalogo_eliminados WHERE producto_id = new.id;
+    END;
+    """)
+    # No incluye la columna version: así el propio UPDATE del trigger no lo vuelve a disparar
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_productos_au
+    AFTER UPDATE OF nombre, precio, stock, stock_defectuoso, categoria_id, unidad_id ON productos BEGIN
+        {subir}
+        UPDATE productos SET version = {actual} WHERE id = new.id;
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_productos_ad AFTER DELETE ON productos BEGIN
+        {subir}
+        INSERT OR REPLACE INTO catalogo_eliminados (producto_id, version) VALUES (old.id, {actual});
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_oferta_productos_ai AFTER INSERT ON oferta_productos BEGIN
+        {subir}
+        UPDATE productos SET version = {actual} WHERE id = new.producto_id;
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_oferta_productos_ad AFTER DELETE ON oferta_productos BEGIN
+        {subir}
+        UPDATE productos SET version = {actual} WHERE id = old.producto_id;
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_ofertas_au AFTER UPDATE ON ofertas BEGIN
+        {subir}
+        UPDATE productos SET version = {actual}
+        WHERE id IN (SELECT producto_id FROM oferta_productos WHERE oferta_id = new.id);
+    END;
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS catalogo_ofertas_ad AFTER DELETE ON ofertas BEGIN
+        {subir}
+        UPDATE productos SET version = {actual}
+        WHERE id IN (SELECT producto_id FROM oferta_productos WHERE oferta_id = old.id);
+    END;
+    """)
+
+
+def _migracion_trabajos(cursor):
+    # Reportes pesados generados en segundo plano (app/utils/trabajos.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS trabajos (
+        id TEXT PRIMARY KEY,
+        clave TEXT NOT NULL UNIQUE,
+        tipo TEXT NOT NULL,
+        parametros TEXT NOT NULL,
+        estado TEXT NOT NULL,
+        archivo TEXT NOT NULL,
+        error TEXT,
+        creado_en TEXT NOT NULL,
+        terminado_en TEXT
+    );
+    """)
+
+
+def _reconstruir_resumenes(cursor):
+    cursor.execute("DELETE FROM resumen_ventas_diarias")
+    cursor.execute("DELETE FROM resumen_ventas_productos")
+    cursor.execute("DELETE FROM resumen_ventas_pagos")
+
+    cursor.execute("""
+        INSERT INTO resumen_ventas_diarias (dia, ventas, total)
+        SELECT substr(fecha,1,10), COUNT(*), SUM(total)
+        FROM ventas
+        GROUP BY substr(fecha,1,10)
+    """)
+    # La columna costo llega con la migración 8
+    con_costo = "costo" in [c[1] for c in cursor.execute("PRAGMA table_info(resumen_ventas_productos)").fetchall()]
+    if con_costo:
+        cursor.execute("""
+            INSERT INTO resumen_ventas_productos (dia, producto_id, cantidad, monto, costo)
+            SELECT substr(v.fecha,1,10), d.producto_id, SUM(d.cantidad), SUM(d.subtotal), SUM(d.costo)
+            FROM detalle_ventas d
+            JOIN ventas v ON d.venta_id = v.id
+            GROUP BY substr(v.fecha,1,10), d.producto_id
+        """)
+    else:
+        cursor.execute("""
+            INSERT INTO resumen_ventas_productos (dia, producto_id, cantidad, monto)
+            SELECT substr(v.fecha,1,10), d.producto_id, SUM(d.cantidad), SUM(d.subtotal)
+            FROM detalle_ventas d
+            JOIN ventas v ON d.venta_id = v.id
+            GROUP BY substr(v.fecha,1,10), d.producto_id
+        """)
+    cursor.execute("""
+        INSERT INTO resumen_ventas_pagos (dia, metodo_id, monto)
+        SELECT substr(v.fecha,1,10), dp.metodo_id, SUM(dp.monto)
+        FROM detalle_pago dp
+        JOIN ventas v ON dp.venta_id = v.id
+        GROUP BY substr(v.fecha,1,10), dp.metodo_id
+    """)
+
+
+def _migracion_resumenes_ventas(cursor):
+    # Resúmenes diarios para el dashboard (app/utils/resumenes.py los mantiene al día)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_ventas_diarias (
+        dia TEXT PRIMARY KEY,
+        ventas INTEGER NOT NULL,
+        total REAL NOT NULL
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_ventas_productos (
+        dia TEXT NOT NULL,
+        producto_id INTEGER NOT NULL,
+        cantidad INTEGER NOT NULL,
+        monto REAL NOT NULL,
+        PRIMARY KEY (dia, producto_id)
+    );
+    """)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS resumen_ventas_pagos (
+        dia TEXT NOT NULL,
+        metodo_id INTEGER NOT NULL,
+        monto REAL NOT NULL,
+        PRIMARY KEY (dia, metodo_id)
+    );
+    """)
+    _reconstruir_resumenes(cursor)
+
+
+def _migracion_costos_productos(cursor):
+    # Costo promedio ponderado por producto: cada ingreso de stock con precio lo
+    # actualiza en O(1), así los reportes de margen no promedian ingresos_stock.
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS costos_productos (
+        producto_id INTEGER PRIMARY KEY,
+        cantidad REAL NOT NULL,
+        costo_total REAL NOT NULL,
+        costo_promedio REAL NOT NULL
+    );
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS costos_ingresos_ai
+    AFTER INSERT ON ingresos_stock WHEN new.precio_unitario IS NOT NULL BEGIN
+        INSERT INTO costos_productos (producto_id, cantidad, costo_total, costo_promedio)
+        VALUES (new.producto_id, new.cantidad, new.cantidad * new.precio_unitario, new.precio_unitario)
+        ON CONFLICT(producto_id) DO UPDATE SET
+            cantidad = cantidad + excluded.cantidad,
+            costo_total = costo_total + excluded.costo_total,
+            costo_promedio = CASE
+                WHEN cantidad + excluded.cantidad > 0
+                THEN (costo_total + excluded.costo_total) / (cantidad + excluded.cantidad)
+                ELSE excluded.costo_promedio
+            END;
+    END;
+    """)
+
+    cursor.execute("DELETE FROM costos_productos")
+    cursor.execute("""
+        INSERT INTO costos_productos (producto_id, cantidad, costo_total, costo_promedio)
+        SELECT
+            producto_id,
+            SUM(cantidad),
+            SUM(cantidad * precio_unitario),
+            CASE WHEN SUM(cantidad) > 0
+                 THEN SUM(cantidad * precio_unitario) / SUM(cantidad)
+                 ELSE AVG(precio_unitario)
+            END
+        FROM ingresos_stock
+        WHERE precio_unitario IS NOT NULL
+        GROUP BY producto_id
+    """)
+
+
+def _reconstruir_lotes(cursor):
+    """
+    Rearma los lotes desde ingresos_stock y recalcula detalle_ventas.costo repasando
+    las ventas en orden (FIFO por producto; sin lotes disponibles, costo promedio).
+    """
+    from collections import deque
+
+    cursor.execute("DELETE FROM lotes_inventario")
+    cursor.execute("""
+        INSERT INTO lotes_inventario (producto_id, ingreso_id, cantidad_inicial, cantidad_restante, costo_unitario, fecha)
+        SELECT i.producto_id, i.id, i.cantidad, i.cantidad,
+               COALESCE(i.precio_unitario, c.costo_promedio, 0), i.fecha
+        FROM ingresos_stock i
+        LEFT JOIN costos_productos c ON c.producto_id = i.producto_id
+        WHERE i.cantidad > 0
+        ORDER BY i.id
+    """)
+
+    lotes = []  # [id, cantidad_restante, costo_unitario], se actualizan en el lugar
+    colas = {}
+    for lote_id, producto_id, restante, costo_unitario in cursor.execute(
+        "SELECT id, producto_id, cantidad_restante, costo_unitario FROM lotes_inventario ORDER BY id"
+    ).fetchall():
+        lote = [lote_id, restante, costo_unitario]
+        lotes.append(lote)
+        colas.setdefault(producto_id, deque()).append(lote)
+    promedios = dict(cursor.execute("SELECT producto_id, costo_promedio FROM costos_productos").fetchall())
+
+    costos = []
+    lineas = cursor.execute("""
+        SELECT d.id, d.producto_id, d.cantidad
+        FROM detalle_ventas d
+        JOIN ventas v ON d.venta_id = v.id
+        ORDER BY v.fecha, v.id, d.id
+    """).fetchall()
+    for detalle_id, producto_id, cantidad in lineas:
+        cola = colas.get(producto_id, deque())
+        costo, restante = 0, cantidad
+        while restante > 0 and cola:
+            lote = cola[0]
+            usado = min(restante, lote[1])
+            costo += usado * lote[2]
+            restante -= usado
+            lote[1] -= usado
+            if lote[1] <= 0:
+                cola.popleft()
+        costo += restante * (promedios.get(producto_id) or 0)
+        costos.append((costo, detalle_id))
+
+    cursor.executemany("UPDATE detalle_ventas SET costo = ? WHERE id = ?", costos)
+    cursor.executemany(
+        "UPDATE lotes_inventario SET cantidad_restante = ? WHERE id = ?",
+        [(lote[1], lote[0]) for lote in lotes]
+    )
+
+
+def _migracion_lotes_inventario(cursor):
+    # Lotes de inventario para costear cada venta por FIFO (app/utils/costos.py)
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS lotes_inventario (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        producto_id INTEGER NOT NULL,
+        ingreso_id INTEGER,
+        cantidad_inicial REAL NOT NULL,
+        cantidad_restante REAL NOT NULL,
+        costo_unitario REAL NOT NULL,
+        fecha TEXT NOT NULL
+    );
+    """)
+    # Cola de lotes abiertos por producto: el consumo FIFO solo toca los que usa
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_lotes_abiertos
+        ON lotes_inventario(producto_id, id) WHERE cantidad_restante > 0
+    """)
+    cursor.execute("""
+    CREATE TRIGGER IF NOT EXISTS lotes_ingresos_ai
+    AFTER INSERT ON ingresos_stock WHEN new.cantidad > 0 BEGIN
+        INSERT INTO lotes_inventario (producto_id, ingreso_id, cantidad_inicial, cantidad_restante, costo_unitario, fecha)
+        VALUES (
+            new.producto_id, new.id, new.cantidad, new.cantidad,
+            COALESCE(new.precio_unitario,
+                     (SELECT costo_promedio FROM costos_productos WHERE producto_id = new.producto_id),
+                     0),
+            new.fecha
+        );
+    END;
+    """)
+
+    for tabla in ("detalle_ventas", "resumen_ventas_productos"):
+        try:
+            cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN costo REAL NOT NULL DEFAULT 0")
+        except sqlite3.OperationalError:
+            pass  # La columna ya existe
+
+    _reconstruir_lotes(cursor)
+    _reconstruir_resumenes(cursor)
+
+
+# Columnas de fecha que se guardan como "YYYY-MM-DD HH:MM:SS" (app/utils/fechas.py)
+COLUMNAS_FECHA = [
+    ("ventas", "fecha"),
+    ("ingresos_stock", "fecha"),
+    ("lotes_inventario", "fecha"),
+    ("ofertas", "fecha_inicio"),
+    ("ofertas", "fecha_fin"),
+    ("carritos_pendientes", "fecha_creacion"),
+    ("trabajos", "creado_en"),
+    ("trabajos", "terminado_en"),
+]
+
+
+def _migracion_normalizar_fechas(cursor):
+    # Antes convivían "YYYY-MM-DD" (datos de ejemplo), "YYYY-MM-DD HH:MM" (ventas),
+    # "YYYY-MM-DDTHH:MM" (ofertas) y "YYYY-MM-DD HH:MM:SS" (ingresos). Se completan al
+    # formato largo sin mover la hora, así todas ordenan y se comparan como texto.
+    for tabla, columna in COLUMNAS_FECHA:
+        cursor.execute(f"""
+            UPDATE {tabla}
+            SET {columna} = CASE length({columna})
+                WHEN 10 THEN {columna} || ' 00:00:00'
+                WHEN 16 THEN replace({columna}, 'T', ' ') || ':00'
+                ELSE replace({columna}, 'T', ' ')
+            END
+            WHERE {columna} IS NOT NULL
+              AND ({columna} LIKE '%T%' OR length({columna}) IN (10, 16))
+        """)
+
+
+def _migracion_actividad_carritos(cursor):
+    # Los carritos abandonados se borran por la última vez que se usaron, no por cuándo
+    # se crearon: uno aparcado hace días y recién retomado está en uso.
+    try:
+        cursor.execute("ALTER TABLE carritos_pendientes ADD COLUMN ultima_actividad TEXT")
+    except sqlite3.OperationalError:
+        pass  # La columna ya existe
+    cursor.execute("UPDATE carritos_pendientes SET ultima_actividad = fecha_creacion WHERE ultima_actividad IS NULL")
+
+
+MIGRACIONES = [
+    (1, "Índices secundarios para las consultas frecuentes", _migracion_indices_secundarios),
+    (2, "Búsqueda de productos con FTS5", _migracion_busqueda_productos),
+    (3, "Descartar estadísticas de ANALYZE desactualizadas", _migracion_descartar_estadisticas),
+    (4, "Versión del catálogo para sincronizar terminales", _migracion_version_catalogo),
+    (5, "Tabla de trabajos en segundo plano", _migracion_trabajos),
+    (6, "Resúmenes diarios de ventas para el dashboard", _migracion_resumenes_ventas),
+    (7, "Costo promedio ponderado por producto", _migracion_costos_productos),
+    (8, "Lotes de inventario y costo FIFO por línea de venta", _migracion_lotes_inventario),
+    (9, "Fechas en un único formato ordenable", _migracion_normalizar_fechas),
+    (10, "Última actividad de los carritos", _migracion_actividad_carritos),
+]
+
+
+def aplicar_migraciones(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        descripcion TEXT NOT NULL,
+        aplicada_en TEXT NOT NULL
+    );
+    """)
+    actual = cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+    for version, descripcion, migracion in MIGRACIONES:
+        if version <= actual:
+            continue
+        migracion(cursor)
+        cursor.execute("""
+            INSERT INTO schema_version (version, descripcion, aplicada_en)
+            VALUES (?, ?, datetime('now', 'localtime'))
+        """, (version, descripcion))
+        conn.commit()
+        print(f"Migración {version} aplicada: {descripcion}")
+
+
+# --------------------------------------------------------------
+# ASESOR DE ÍNDICES
+# --------------------------------------------------------------
+# Consultas representativas de la app (con parámetros de ejemplo).
+# EXPLAIN QUERY PLAN avisa cuáles siguen recorriendo tablas completas.
+
+CONSULTAS_CONOCIDAS = [
+    ("productos.autocomplete (FTS5)", """
+        SELECT p.id, p.nombre, p.precio, u.nombre AS unidad
+        FROM productos_fts f
+        JOIN productos p ON p.id = f.rowid
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        WHERE productos_fts MATCH ? ORDER BY f.rank LIMIT 10
+    """, ('"man"*',)),
+    ("indice_ofertas (ofertas activas)", """
+        SELECT o.id, op.producto_id FROM ofertas o
+        JOIN oferta_productos op ON o.id = op.oferta_id
+        WHERE o.activo = 1 ORDER BY o.fecha_inicio DESC, o.id DESC
+    """, ()),
+    ("ofertas.editar (productos de la oferta)", """
+        SELECT op.*, p.nombre FROM oferta_productos op
+        JOIN productos p ON op.producto_id = p.id WHERE op.oferta_id = ?
+    """, (1,)),
+    ("reportes.index (ventas por fecha)", """
+        SELECT v.* FROM ventas v
+        WHERE v.fecha >= ? AND v.fecha < ?
+        ORDER BY v.fecha DESC, v.id DESC LIMIT 201
+    """, ("2025-01-01 00:00:00", "2025-02-01 00:00:00")),
+    ("reportes.export_pdf (detalle de venta)", """
+        SELECT d.cantidad, p.nombre, u.nombre FROM detalle_ventas d
+        JOIN productos p ON d.producto_id = p.id
+        LEFT JOIN unidades u ON p.unidad_id = u.id
+        WHERE d.venta_id = ?
+    """, (1,)),
+    ("reportes.filtro por producto", """
+        SELECT v.* FROM ventas v WHERE EXISTS (
+            SELECT 1 FROM detalle_ventas d WHERE d.venta_id = v.id AND d.producto_id IN (?)
+        ) ORDER BY v.fecha DESC LIMIT 200
+    """, (1,)),
+    ("reportes.data (ventas por día)", """
+        SELECT dia, total FROM resumen_ventas_diarias ORDER BY dia ASC
+    """, ()),
+    ("reportes.data (top productos)", """
+        SELECT p.nombre, SUM(r.cantidad) AS cantidad FROM resumen_ventas_productos r
+        JOIN productos p ON r.producto_id = p.id GROUP BY r.producto_id ORDER BY cantidad DESC LIMIT 7
+    """, ()),
+    ("reportes.ganancias_netas (costo por día)", """
+        SELECT dia, SUM(costo) FROM resumen_ventas_productos GROUP BY dia
+    """, ()),
+    ("ventas.finalizar (lotes FIFO)", """
+        SELECT id, cantidad_restante, costo_unitario FROM lotes_inventario
+        WHERE producto_id = ? AND cantidad_restante > 0 ORDER BY id
+    """, (1,)),
+    ("reportes.index (página siguiente)", """
+        SELECT v.* FROM ventas v WHERE (v.fecha, v.id) < (?, ?)
+        ORDER BY v.fecha DESC, v.id DESC LIMIT 201
+    """, ("2025-01-31 10:00", 100)),
+    ("proveedores.ingresos (página siguiente)", """
+        SELECT i.id, i.fecha FROM ingresos_stock i
+        JOIN productos p ON i.producto_id = p.id
+        WHERE i.proveedor_id = ? AND (i.fecha, i.id) < (?, ?)
+        ORDER BY i.fecha DESC, i.id DESC LIMIT 101
+    """, (1, "2025-01-31 10:00", 100)),
+    ("proveedores.lista (compras por proveedor)", """
+        SELECT p.id, COUNT(i.id) FROM proveedores p
+        LEFT JOIN ingresos_stock i ON p.id = i.proveedor_id GROUP BY p.id
+    """, ()),
+    ("ventas.aparcados", """
+        SELECT c.id, COUNT(d.id) FROM carritos_pendientes c
+        LEFT JOIN detalle_carritos d ON d.carrito_id = c.id
+        WHERE c.usuario_id = ? AND c.estado = 'aparcado' GROUP BY c.id
+    """, (1,)),
+]
+
+
+def asesor_indices(db_name=None):
+    """Imprime las consultas conocidas que todavía hacen SCAN completo de alguna tabla."""
+    conn = sqlite3.connect(db_name or DB_NAME)
+    problemas = 0
+
+    for nombre, sql, params in CONSULTAS_CONOCIDAS:
+        try:
+            plan = conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+        except sqlite3.OperationalError as e:
+            print(f"[?] {nombre}: {e} (¿falta correr init_db.py?)")
+            continue
+        # Cada fila es (id, parent, notused, detail); "SEARCH" usa un índice para buscar,
+        # "SCAN" recorre la tabla (o un índice entero, si dice USING INDEX) de punta a punta
+        scans = [p[3] for p in plan if p[3].startswith("SCAN")]
+        temporales = [p[3] for p in plan if "TEMP B-TREE" in p[3]]
+        if scans or temporales:
+            problemas += 1
+            print(f"[!] {nombre}")
+            for detalle in scans + temporales:
+                print(f"      {detalle}")
+        else:
+            print(f"[ok] {nombre}")
+
+    conn.close()
+    print(f"\n{problemas} de {len(CONSULTAS_CONOCIDAS)} consultas con recorridos completos u ordenamientos temporales.")
+    print("Nota: un SCAN ... USING INDEX seguido de LIMIT corta temprano y suele estar bien.")
+
+
+# --------------------------------------------------------------
+# RESÚMENES DE VENTAS
+# --------------------------------------------------------------
+
+def reconstruir_resumenes(db_name=None):
+    """Vuelve a calcular los resúmenes diarios desde ventas (backfill o reparación)."""
+    conn = sqlite3.connect(db_name or DB_NAME)
+    _reconstruir_resumenes(conn.cursor())
+    conn.commit()
+    dias = conn.execute("SELECT COUNT(*) FROM resumen_ventas_diarias").fetchone()[0]
+    conn.close()
+    print(f"Resúmenes reconstruidos: {dias} días.")
+
+
+def reconstruir_costos(db_name=None):
+    """Rearma los lotes FIFO, el costo de cada línea de venta y los resúmenes."""
+    conn = sqlite3.connect(db_name or DB_NAME)
+    cursor = conn.cursor()
+    _reconstruir_lotes(cursor)
+    _reconstruir_resumenes(cursor)
+    conn.commit()
+    lotes = conn.execute("SELECT COUNT(*) FROM lotes_inventario WHERE cantidad_restante > 0").fetchone()[0]
+    conn.close()
+    print(f"Costos reconstruidos: {lotes} lotes con stock.")
+
+
+# --------------------------------------------------------------
+# DATOS SINTÉTICOS (benchmarks)
+# --------------------------------------------------------------
+# Catálogo, compras, ofertas y ventas a escala configurable y reproducible (misma
+# semilla, mismos datos). Las ventas se cargan directo en las tablas: después hay
+# que llamar a reconstruir_costos() para armar lotes, costos y resúmenes.
+
+ESCALAS = {
+    "chica": {"productos": 500, "ventas": 5000, "ofertas": 30, "compras": 2000},
+    "media": {"productos": 2000, "ventas": 50000, "ofertas": 100, "compras": 10000},
+    "grande": {"productos": 10000, "ventas": 300000, "ofertas": 400, "compras": 60000},
+}
+
+_BASES = ["Manzana", "Banana", "Papa", "Cebolla", "Tomate", "Lechuga", "Zanahoria", "Naranja",
+          "Limón", "Zapallo", "Batata", "Pera", "Uva", "Acelga", "Espinaca", "Morrón",
+          "Pepino", "Ajo", "Choclo", "Durazno"]
+_VARIEDADES = ["Roja", "Verde", "Blanca", "Criolla", "Premium", "Orgánica", "Grande", "Chica",
+               "Nacional", "Importada"]
+
+
+def sembrar_sintetico(conn, productos=2000, ventas=50000, ofertas=100, compras=10000,
+                      dias=365, proveedores=20, semilla=1):
+    """Agrega datos sintéticos a una base con el esquema ya creado. No hace commit."""
+    import random
+    from datetime import datetime, timedelta
+
+    rnd = random.Random(semilla)
+    formato = "%Y-%m-%d %H:%M:%S"
+    hoy = datetime.now().replace(microsecond=0)
+    inicio = hoy - timedelta(days=dias)
+
+    def fecha_al_azar(desde, hasta):
+        return desde + timedelta(seconds=rnd.randrange(int((hasta - desde).total_seconds()) or 1))
+
+    categorias = [r[0] for r in conn.execute("SELECT id FROM categorias")]
+    unidades = [r[0] for r in conn.execute("SELECT id FROM unidades")]
+    metodos = [r[0] for r in conn.execute("SELECT id FROM metodos_pago")]
+
+    conn.executemany("""
+        INSERT INTO proveedores (nombre, contacto, telefono, email) VALUES (?, '', '', '')
+    """, [(f"Proveedor sintético {semilla}-{i}",) for i in range(proveedores)])
+    ids_proveedores = [r[0] for r in conn.execute("SELECT id FROM proveedores")]
+
+    # Stock alto para que las ventas del benchmark nunca fallen por falta de stock
+    primero = (conn.execute("SELECT MAX(id) FROM productos").fetchone()[0] or 0) + 1
+    catalogo = [
+        (primero + i, f"{rnd.choice(_BASES)} {rnd.choice(_VARIEDADES)} {i}", rnd.randrange(100, 5000),
+         1_000_000, rnd.choice(categorias), rnd.choice(unidades))
+        for i in range(productos)
+    ]
+    conn.executemany("""
+        INSERT INTO productos (id, nombre, precio, stock, categoria_id, unidad_id)
+        VALUES (?, ?, ?, ?, ?, ?)
+    """, catalogo)
+    precios = {p[0]: p[2] for p in catalogo}
+    ids_productos = list(precios)
+
+    conn.executemany("""
+        INSERT INTO ingresos_stock (producto_id, proveedor_id, cantidad, fecha, precio_unitario)
+        VALUES (?, ?, ?, ?, ?)
+    """, sorted([
+        (pid, rnd.choice(ids_proveedores), rnd.randrange(10, 200),
+         fecha_al_azar(inicio - timedelta(days=30), hoy).strftime(formato),
+         round(precios[pid] * rnd.uniform(0.4, 0.8), 2))
+        for pid in (rnd.choice(ids_productos) for _ in range(compras))
+    ], key=lambda c: c[3]))
+
+    tipos = ["individual_precio", "individual_cantidad", "conjunto_descuento"]
+    for i in range(ofertas):
+        # La mitad vigentes hoy, el resto ya vencidas
+        desde = fecha_al_azar(hoy - timedelta(days=10), hoy) if i % 2 == 0 else fecha_al_azar(inicio, hoy - timedelta(days=30))
+        cur = conn.execute("""
+            INSERT INTO ofertas (nombre, descripcion, fecha_inicio, fecha_fin, tipo_oferta, activo, descuento_global)
+            VALUES (?, '', ?, ?, ?, ?, ?)
+        """, (f"Oferta sintética {i}", desde.strftime(formato), (desde + timedelta(days=20)).strftime(formato),
+              tipos[i % 3], 1 if i % 2 == 0 else 0, 10 if tipos[i % 3] == "conjunto_descuento" else 0))
+        conn.executemany("""
+            INSERT INTO oferta_productos (oferta_id, producto_id, precio_oferta, cantidad_minima, descuento_porcentaje)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(cur.lastrowid, pid, round(precios[pid] * 0.8, 2), 3, 15)
+              for pid in rnd.sample(ids_productos, min(3, len(ids_productos)))])
+
+    primera_venta = (conn.execute("SELECT MAX(id) FROM ventas").fetchone()[0] or 0) + 1
+    fechas = sorted(fecha_al_azar(inicio, hoy).strftime(formato) for _ in range(ventas))
+    filas_ventas, detalle, pagos = [], [], []
+    for n, fecha in enumerate(fechas):
+        venta_id = primera_venta + n
+        total = 0
+        for pid in rnd.sample(ids_productos, min(rnd.randint(1, 5), len(ids_productos))):
+            cantidad = rnd.randint(1, 3)
+            detalle.append((venta_id, pid, cantidad, cantidad * precios[pid]))
+            total += cantidad * precios[pid]
+        filas_ventas.append((venta_id, fecha, total))
+        pagos.append((venta_id, rnd.choice(metodos), total))
+
+    conn.executemany("INSERT INTO ventas (id, fecha, total) VALUES (?, ?, ?)", filas_ventas)
+    conn.executemany("""
+        INSERT INTO detalle_ventas (venta_id, producto_id, cantidad, subtotal) VALUES (?, ?, ?, ?)
+    """, detalle)
+    conn.executemany("INSERT INTO detalle_pago (venta_id, metodo_id, monto) VALUES (?, ?, ?)", pagos)
+
+
+def crear_base_sintetica(db_name, escala="media", **cantidades):
+    """Crea el esquema en `db_name`, lo siembra y reconstruye costos y resúmenes."""
+    init_db(db_name)
+    conn = sqlite3.connect(db_name)
+    sembrar_sintetico(conn, **{**ESCALAS[escala], **cantidades})
+    conn.commit()
+    conn.close()
+    reconstruir_costos(db_name)
+
+
 if __name__ == "__main__":
-    init_db()
+    import sys
+    if "--asesor" in sys.argv:
+        asesor_indices()
+    elif "--resumenes" in sys.argv:
+        reconstruir_resumenes()
+    elif "--costos" in sys.argv:
+        reconstruir_costos()
+    elif "--sintetico" in sys.argv:
+        # python init_db.py --sintetico bench.db [chica|media|grande]
+        argumentos = sys.argv[sys.argv.index("--sintetico") + 1:]
+        crear_base_sintetica(argumentos[0], *argumentos[1:2])
+    else:
+        init_db()